@@ -0,0 +1,160 @@
+"""
+Semantic answer cache for /chat.
+
+Answers are cached per (index generation, scope), where the scope holds the
+model and retrieval settings that shape the answer. A question hits the
+cache when its normalized text matches a cached question exactly, or when
+its embedding is within a cosine-similarity threshold of one. The whole
+cache is dropped when the index generation moves, so answers never outlive
+the corpus they were generated from.
+"""
+
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from cache_utils import TTLCache
+from logger import model_logger
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    text = _WHITESPACE.sub(" ", question.lower()).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+class CachedAnswer:
+    __slots__ = ("question", "embedding", "answer", "sources")
+
+    def __init__(self, question: str, embedding: np.ndarray, answer: str,
+                 sources: List[Dict[str, Any]]):
+        self.question = question
+        self.embedding = embedding
+        self.answer = answer
+        self.sources = sources
+
+
+class SemanticAnswerCache:
+    """LRU/TTL answer cache with exact and near-duplicate question matching."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 3600,
+                 threshold: float = 0.95):
+        """
+        Args:
+            maxsize: Maximum number of cached answers
+            ttl: Seconds a cached answer stays valid, or None for no expiry
+            threshold: Minimum cosine similarity for a near-duplicate hit
+        """
+        self.threshold = threshold
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = None
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _sync_generation(self, generation: int) -> bool:
+        """Drop everything if the index moved on; False if generation is stale."""
+        with self._lock:
+            if self._generation is None or generation > self._generation:
+                if self._generation is not None and len(self._entries):
+                    model_logger.info(
+                        f"Index generation {generation}: dropping {len(self._entries)} cached answers")
+                self._entries.clear()
+                self._generation = generation
+            return generation == self._generation
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+        self,
+        generation: int,
+        scope: Hashable,
+        question: str,
+        embed: Callable[[str], List[float]]
+    ) -> Tuple[Optional[CachedAnswer], Optional[np.ndarray]]:
+        """
+        Find a cached answer for the question.
+
+        Returns:
+            (entry or None, the question's unit embedding if one was computed).
+            Pass the embedding back to store() to avoid embedding twice.
+        """
+        if not self._sync_generation(generation):
+            self.misses += 1
+            return None, None
+
+        text = normalize_question(question)
+        entry = self._entries.get((scope, text))
+        if entry is not None:
+            self.exact_hits += 1
+            return entry, None
+
+        candidates = [(key, entry) for key, entry in self._entries.items()
+                      if key[0] == scope]
+        if not candidates or self.threshold > 1:
+            self.misses += 1
+            return None, None
+
+        query = self._unit(embed(question))
+        similarities = np.stack(
+            [entry.embedding for _, entry in candidates]) @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            key, entry = candidates[best]
+            self._entries.get(key)  # refresh LRU position
+            self.semantic_hits += 1
+            model_logger.info(
+                f"Semantic cache hit (similarity {similarities[best]:.3f}) for: {question[:50]}...")
+            return entry, query
+
+        self.misses += 1
+        return None, query
+
+    def store(
+        self,
+        generation: int,
+        scope: Hashable,
+        question: str,
+        answer: str,
+        sources: List[Dict[str, Any]],
+        embed: Callable[[str], List[float]],
+        embedding: Optional[np.ndarray] = None
+    ) -> None:
+        """Cache an answer generated against the given index generation."""
+        if not self._sync_generation(generation):
+            return
+        if embedding is None:
+            embedding = self._unit(embed(question))
+        text = normalize_question(question)
+        self._entries.put((scope, text),
+                          CachedAnswer(question, embedding, answer, sources))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "generation": self._generation,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+        }
+
+
+answer_cache = SemanticAnswerCache(
+    maxsize=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+)
@@ -0,0 +1,195 @@
+"""
+SQLite chunk store behind the FAISS index.
+
+Chunk text and metadata live in the chunks table of rag_app.db, keyed by
+chunk ID, the docstore ID FAISS maps each vector to. ChunkDocstore plugs
+that table into LangChain's FAISS wrapper as its docstore:
+- retrieval hydrates only the chunks it hits;
+- per-file operations are indexed lookups on file_id;
+- the pickled index.pkl only holds a reference to the store, so loading
+  the index no longer unpickles every chunk.
+"""
+
+import json
+import sqlite3
+from typing import Callable, Dict, List, Optional, Union
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores.faiss import FAISS
+from langchain_core.documents import Document
+from metadata_filter import MetadataFilter
+from logger import db_logger, PerformanceTimer
+
+
+class ChunkDocstore(Docstore, AddableMixin):
+    """LangChain docstore over the chunks table; IDs are chunk IDs as strings."""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        """
+        Args:
+            connect: Returns a connection to the database holding the chunks table
+        """
+        self.connect = connect
+
+    def __reduce__(self):
+        # FAISS.save_local pickles the docstore; store a reference, not the rows
+        return (get_chunk_docstore, ())
+
+    @staticmethod
+    def _to_document(row) -> Document:
+        return Document(id=str(row[0]), page_content=row[1], metadata=json.loads(row[2]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Store chunks, replacing any with the same chunk ID."""
+        rows = [
+            (int(chunk_id), doc.metadata.get("file_id"), doc.metadata.get("page"),
+             doc.metadata.get("type"), doc.page_content,
+             json.dumps(doc.metadata, default=str))
+            for chunk_id, doc in texts.items()
+        ]
+        if not rows:
+            return
+        with PerformanceTimer(db_logger, f"chunks_add:{len(rows)}"):
+            conn = self.connect()
+            try:
+                # An upsert, not INSERT OR REPLACE: REPLACE skips the delete
+                # trigger that keeps chunk_fts in sync
+                conn.executemany(
+                    '''INSERT INTO chunks (chunk_id, file_id, page, type, text, metadata)
+                       VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (chunk_id) DO UPDATE SET
+                           file_id = excluded.file_id, page = excluded.page,
+                           type = excluded.type, text = excluded.text,
+                           metadata = excluded.metadata''',
+                    rows)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Look up one chunk; like InMemoryDocstore, a miss returns a message."""
+        document = self.mget([search])[0]
+        return document if document is not None else f"ID {search} not found."
+
+    def mget(self, ids: List[str]) -> List[Optional[Document]]:
+        """Look up chunks in one query, in the order given (None for misses)."""
+        chunk_ids = [int(chunk_id) for chunk_id in ids if str(chunk_id).isdigit()]
+        found = {}
+        if chunk_ids:
+            conn = self.connect()
+            try:
+                rows = conn.execute(
+                    f"SELECT chunk_id, text, metadata FROM chunks WHERE chunk_id IN ({', '.join('?' * len(chunk_ids))})",
+                    chunk_ids).fetchall()
+            finally:
+                conn.close()
+            found = {str(row[0]): self._to_document(row) for row in rows}
+        return [found.get(str(chunk_id)) for chunk_id in ids]
+
+    def delete(self, ids: List) -> None:
+        chunk_ids = [(int(chunk_id),) for chunk_id in ids]
+        conn = self.connect()
+        try:
+            conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", chunk_ids)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        """Remove every chunk, for when the FAISS index is created from scratch."""
+        conn = self.connect()
+        try:
+            conn.execute("DELETE FROM chunks")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def matching_ids(self, metadata_filter: MetadataFilter) -> List[str]:
+        """IDs of the chunks matching a metadata filter."""
+        condition, params = metadata_filter.sql_condition()
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                f"SELECT chunk_id FROM chunks WHERE {condition}", params).fetchall()
+        finally:
+            conn.close()
+        return [str(row[0]) for row in rows]
+
+    def file_chunk_ids(self, file_id: int) -> List[str]:
+        """IDs of a file's chunks."""
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                "SELECT chunk_id FROM chunks WHERE file_id = ? ORDER BY chunk_id", (file_id,)).fetchall()
+        finally:
+            conn.close()
+        return [str(row[0]) for row in rows]
+
+    def file_ids(self) -> List[int]:
+        """IDs of the files with indexed chunks."""
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT file_id FROM chunks WHERE file_id IS NOT NULL").fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def max_chunk_id(self) -> int:
+        """The highest stored chunk ID, or -1 if there is none."""
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT max(chunk_id) FROM chunks").fetchone()
+        finally:
+            conn.close()
+        return row[0] if row[0] is not None else -1
+
+    @property
+    def docs(self) -> Dict[str, Document]:
+        """Every chunk; only for building in-memory indexes such as BM25."""
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                "SELECT chunk_id, text, metadata FROM chunks ORDER BY chunk_id").fetchall()
+        finally:
+            conn.close()
+        return {str(row[0]): self._to_document(row) for row in rows}
+
+
+def copy_without_vectors(vectorstore: FAISS, ids: List[str]) -> FAISS:
+    """
+    Copy a FAISS store without the given chunks' vectors.
+
+    Unlike FAISS.delete, neither the original index nor the docstore is
+    touched, so searches on the original keep finding their chunks until the
+    copy replaces it; delete the chunks from the store after that.
+    """
+    removed = set(ids)
+    positions = [position for position, docstore_id in vectorstore.index_to_docstore_id.items()
+                 if docstore_id in removed]
+    index = faiss.clone_index(vectorstore.index)
+    index.remove_ids(np.asarray(positions, dtype=np.int64))
+    # remove_ids compacts the remaining vectors, keeping their order
+    remaining = [docstore_id for _, docstore_id in sorted(vectorstore.index_to_docstore_id.items())
+                 if docstore_id not in removed]
+    return FAISS(
+        vectorstore.embedding_function,
+        index,
+        vectorstore.docstore,
+        dict(enumerate(remaining)),
+        normalize_L2=vectorstore._normalize_L2,
+        distance_strategy=vectorstore.distance_strategy
+    )
+
+
+_chunk_docstore: Optional[ChunkDocstore] = None
+
+
+def get_chunk_docstore() -> ChunkDocstore:
+    """The chunk store in rag_app.db, on the pooled db_utils connections."""
+    global _chunk_docstore
+    if _chunk_docstore is None:
+        from db_utils import get_db_connection
+        _chunk_docstore = ChunkDocstore(get_db_connection)
+    return _chunk_docstore
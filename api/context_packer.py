@@ -0,0 +1,160 @@
+"""
+Token-budgeted context packing for the stuff-documents chain.
+
+Text chunks are split with a 200 character overlap, so neighbouring chunks
+retrieved together repeat text, and several retrieval legs can return the
+same passage. The packer merges adjacent text chunks from the same page
+(consecutive chunk IDs) into one passage with the overlap removed, drops
+passages already contained in another, orders what is left by fused score,
+and stops adding passages at a token budget.
+"""
+
+import os
+import re
+from typing import List, Optional
+from langchain_core.documents import Document
+from logger import model_logger
+
+# Score keys in order of preference: fused scores first, then single legs
+SCORE_KEYS = ("rrf_score", "fusion_score", "vector_score", "bm25_score")
+
+# Rough characters-per-token ratio; Gemini has no offline tokenizer
+CHARS_PER_TOKEN = 4
+
+# Longest overlap searched when joining adjacent chunks (splitter uses 200)
+MAX_OVERLAP_CHARS = 400
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def doc_score(doc: Document) -> Optional[float]:
+    for key in SCORE_KEYS:
+        score = doc.metadata.get(key)
+        if score is not None:
+            return float(score)
+    return None
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _join(left: str, right: str) -> str:
+    size = _overlap(left, right)
+    if size:
+        return left + right[size:]
+    return f"{left}\n{right}"
+
+
+def _adjacent(previous: Document, doc: Document) -> bool:
+    a, b = previous.metadata, doc.metadata
+    return (
+        a.get("type", "text") == "text" and b.get("type", "text") == "text"
+        and a.get("file_id") == b.get("file_id")
+        and a.get("page") == b.get("page")
+        and a.get("chunk_id") is not None and b.get("chunk_id") is not None
+        and b["chunk_id"] == a["chunk_id"] + 1
+    )
+
+
+class _Passage:
+    __slots__ = ("docs", "text", "score", "rank")
+
+    def __init__(self, doc: Document, score: Optional[float], rank: int):
+        self.docs = [doc]
+        self.text = doc.page_content
+        self.score = score
+        self.rank = rank
+
+    def extend(self, doc: Document, score: Optional[float], rank: int):
+        self.docs.append(doc)
+        self.text = _join(self.text, doc.page_content)
+        if score is not None and (self.score is None or score > self.score):
+            self.score = score
+        self.rank = min(self.rank, rank)
+
+    def to_document(self) -> Document:
+        first = self.docs[0]
+        if len(self.docs) == 1:
+            return first
+        metadata = dict(first.metadata)
+        metadata["chunk_ids"] = [doc.metadata["chunk_id"] for doc in self.docs]
+        for key in SCORE_KEYS:
+            if key in metadata and self.score is not None:
+                metadata[key] = self.score
+        return Document(page_content=self.text, metadata=metadata)
+
+
+def pack_context(documents: List[Document], token_budget: Optional[int] = None) -> List[Document]:
+    """
+    Merge, dedupe, order and budget retrieved documents for the prompt.
+
+    Args:
+        documents: Retrieved documents, best first
+        token_budget: Approximate prompt tokens allowed for the context;
+            defaults to CONTEXT_TOKEN_BUDGET (2000)
+
+    Returns:
+        The packed documents, best first
+    """
+    if not documents:
+        return []
+    if token_budget is None:
+        token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+
+    # Merge runs of consecutive chunks from the same page
+    ranked = list(enumerate(documents))
+    ranked.sort(key=lambda item: (
+        item[1].metadata.get("chunk_id") is None,
+        item[1].metadata.get("chunk_id") or 0))
+    passages = []
+    previous = None
+    for rank, doc in ranked:
+        score = doc_score(doc)
+        if previous is not None and _adjacent(previous, doc):
+            passages[-1].extend(doc, score, rank)
+        else:
+            passages.append(_Passage(doc, score, rank))
+        previous = doc
+
+    # Best first: by fused score, falling back to retrieval order
+    passages.sort(key=lambda p: (
+        p.score is None, -(p.score or 0.0), p.rank))
+
+    # Drop passages whose text already appears in a better one
+    kept = []
+    seen = []
+    for passage in passages:
+        normalized = _WHITESPACE.sub(" ", passage.text).strip().lower()
+        if any(normalized in other for other in seen):
+            continue
+        seen.append(normalized)
+        kept.append(passage)
+
+    packed = []
+    used = 0
+    for passage in kept:
+        tokens = estimate_tokens(passage.text)
+        if used + tokens > token_budget:
+            if not packed:
+                # Always keep the best passage, cut to the budget
+                doc = passage.to_document()
+                packed.append(Document(
+                    page_content=passage.text[:token_budget * CHARS_PER_TOKEN],
+                    metadata=doc.metadata))
+                used = token_budget
+            break
+        packed.append(passage.to_document())
+        used += tokens
+
+    model_logger.info(
+        f"Packed {len(documents)} retrieved documents into {len(packed)} passages (~{used} tokens, budget {token_budget})")
+    return packed
@@ -0,0 +1,64 @@
+"""
+SQLite storage configuration for rag_app.db.
+
+Every pooled connection is configured here when it is opened. The defaults
+put the database in WAL mode, so /chat log writes no longer block
+/documents and history reads, and they tune syncing, caching and lock
+waiting for a small, write-heavy application database. Each setting can be
+overridden from the environment.
+"""
+
+import os
+import sqlite3
+from typing import Dict
+
+# PRAGMA name -> (environment variable, default), applied in this order
+_PRAGMA_SETTINGS = {
+    # Wait for a lock instead of failing with "database is locked"; first,
+    # so the PRAGMAs below wait too
+    "busy_timeout": ("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    # Lets log retention return freed pages to the OS a few at a time. Only
+    # takes effect on a new database, so it must precede journal_mode;
+    # existing ones switch at their next VACUUM
+    "auto_vacuum": ("SQLITE_AUTO_VACUUM", "INCREMENTAL"),
+    # Readers and the writer no longer block each other
+    "journal_mode": ("SQLITE_JOURNAL_MODE", "WAL"),
+    # Safe with WAL: a power loss can drop the last commits but not corrupt
+    "synchronous": ("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative values are KiB: 64 MiB page cache per connection
+    "cache_size": ("SQLITE_CACHE_SIZE", "-65536"),
+    # Read through a 256 MiB memory map instead of read() calls
+    "mmap_size": ("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": ("SQLITE_TEMP_STORE", "MEMORY"),
+    "foreign_keys": ("SQLITE_FOREIGN_KEYS", "ON"),
+}
+
+
+def pragma_settings() -> Dict[str, str]:
+    """The PRAGMA values to apply, after environment overrides."""
+    return {pragma: os.getenv(env_var, default)
+            for pragma, (env_var, default) in _PRAGMA_SETTINGS.items()}
+
+
+def configure_connection(conn: sqlite3.Connection, settings: Dict[str, str] = None) -> Dict[str, str]:
+    """
+    Apply the storage PRAGMAs to a new connection.
+
+    Returns:
+        The values SQLite reports after applying them (journal_mode, for
+        instance, stays "memory" for in-memory databases)
+    """
+    settings = settings if settings is not None else pragma_settings()
+    applied = {}
+    for pragma, value in settings.items():
+        if pragma == "journal_mode":
+            # Persistent in the database file, and changing it takes a lock;
+            # only switch when the file is not already in this mode
+            current = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            if current.lower() == value.lower():
+                applied[pragma] = current
+                continue
+        conn.execute(f"PRAGMA {pragma} = {value}")
+        row = conn.execute(f"PRAGMA {pragma}").fetchone()
+        applied[pragma] = str(row[0]) if row is not None else value
+    return applied
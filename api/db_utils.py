@@ -1,9 +1,15 @@
 import sqlite3
+import threading
 from datetime import datetime
 from logger import db_logger, error_logger, PerformanceTimer
+from db_config import configure_connection
+from migrations import apply_migrations
+from cache_utils import TTLCache
 import os
 import hashlib
 import secrets
+import base64
+import json
 
 DB_NAME = "rag_app.db"
 UPLOAD_DIR = "./uploaded_files"
@@ -15,12 +21,75 @@ if not os.path.exists(DB_NAME):
 else:
     db_logger.info(f"Using existing database: {DB_NAME}")
 
+# Read-through cache for user lookups, keyed by ("id", user_id) or
+# ("username", username). Writes through db_utils invalidate it; the TTL
+# bounds how stale another worker process's copy can get.
+_user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")))
+
+# Connection pool: one long-lived connection per thread, opened and
+# configured on first use and reused by every db_utils call on that thread
+_pool_local = threading.local()
+_pool_lock = threading.Lock()
+_pool_connections = []
+
+
+class PooledConnection:
+    """
+    A thread's pooled connection, handed out by get_db_connection().
+
+    Behaves like sqlite3.Connection, except that close() returns the
+    connection to the pool: an uncommitted transaction is rolled back, as
+    closing a connection would, but the connection itself stays open.
+
+    The thread shares one connection between everyone holding it, so only
+    the outermost holder's close() rolls back; a helper called in the middle
+    of its caller's transaction leaves that transaction alone.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._holders = 0
+
+    def checkout(self):
+        self._holders += 1
+        return self
+
+    def close(self):
+        self._holders = max(self._holders - 1, 0)
+        if self._holders == 0 and self._conn.in_transaction:
+            self._conn.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+
+def _open_connection(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    applied = configure_connection(conn)
+    with _pool_lock:
+        _pool_connections.append(conn)
+    db_logger.info(
+        f"Opened pooled connection to {path} for thread {threading.current_thread().name} "
+        f"(journal_mode={applied['journal_mode']}, synchronous={applied['synchronous']})")
+    return conn
+
 
 def get_db_connection():
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        return conn
+        pooled = getattr(_pool_local, "connection", None)
+        if pooled is None or _pool_local.path != DB_NAME:
+            _pool_local.connection = PooledConnection(_open_connection(DB_NAME))
+            _pool_local.path = DB_NAME
+        return _pool_local.connection.checkout()
     except Exception as e:
         error_msg = f"Failed to connect to database: {str(e)}"
         db_logger.error(error_msg)
@@ -28,109 +97,102 @@ def get_db_connection():
         raise
 
 
-def check_column_exists(table_name, column_name):
-    """Check if a column exists in a table."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = cursor.fetchall()
-        conn.close()
-
-        for column in columns:
-            if column['name'] == column_name:
-                return True
-        return False
-    except Exception as e:
-        error_msg = f"Failed to check column existence: {str(e)}"
-        db_logger.error(error_msg)
-        error_logger.error(error_msg, exc_info=True)
-        return False
-
-
-def add_column_if_not_exists(table_name, column_name, column_type):
-    """Add a column to a table if it doesn't exist."""
-    try:
-        if not check_column_exists(table_name, column_name):
-            conn = get_db_connection()
-            conn.execute(
-                f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
-            conn.commit()
+def close_db_connections():
+    """Close every pooled connection; call once at shutdown."""
+    with _pool_lock:
+        connections = list(_pool_connections)
+        _pool_connections.clear()
+    for conn in connections:
+        try:
             conn.close()
-            db_logger.info(f"Added column {column_name} to table {table_name}")
-            return True
-        return False
-    except Exception as e:
-        error_msg = f"Failed to add column {column_name} to table {table_name}: {str(e)}"
-        db_logger.error(error_msg)
-        error_logger.error(error_msg, exc_info=True)
-        return False
+        except sqlite3.Error as e:
+            error_logger.error(
+                f"Failed to close pooled connection: {str(e)}", exc_info=True)
+    db_logger.info(f"Closed {len(connections)} pooled database connections")
 
 
-def create_application_logs():
-    with PerformanceTimer(db_logger, "create_application_logs"):
+def insert_application_logs(session_id, question, answer, model, processing_time=0.0):
+    with PerformanceTimer(db_logger, f"insert_logs:{session_id}"):
         try:
             conn = get_db_connection()
-            conn.execute('''CREATE TABLE IF NOT EXISTS application_logs
-                            (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                             session_id TEXT,
-                             user_query TEXT,
-                             gpt_response TEXT,
-                             model TEXT,
-                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-            conn.close()
-            db_logger.info("Application logs table created or verified")
+            try:
+                conn.execute('''INSERT INTO application_logs 
+                                (session_id, user_query, gpt_response, model, processing_time) 
+                                VALUES (?, ?, ?, ?, ?)''',
+                             (session_id, question, answer, model, processing_time))
+                conn.commit()
+            finally:
+                conn.close()
+            db_logger.info(f"Inserted log for session: {session_id}")
+        except Exception as e:
+            error_msg = f"Failed to insert application log: {str(e)}"
+            db_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            raise
+
 
-            # Add processing_time column if it doesn't exist
-            add_column_if_not_exists(
-                "application_logs", "processing_time", "REAL")
+def insert_application_logs_batch(rows):
+    """
+    Insert many chat logs in one transaction.
 
+    Args:
+        rows: (session_id, question, answer, model, processing_time) tuples
+    """
+    with PerformanceTimer(db_logger, f"insert_logs_batch:{len(rows)}"):
+        conn = get_db_connection()
+        try:
+            conn.executemany('''INSERT INTO application_logs 
+                                (session_id, user_query, gpt_response, model, processing_time) 
+                                VALUES (?, ?, ?, ?, ?)''', rows)
+            conn.commit()
+            db_logger.info(f"Inserted {len(rows)} logs in one batch")
         except Exception as e:
-            error_msg = f"Failed to create application logs table: {str(e)}"
+            error_msg = f"Failed to insert batch of {len(rows)} application logs: {str(e)}"
             db_logger.error(error_msg)
             error_logger.error(error_msg, exc_info=True)
             raise
+        finally:
+            # Don't leave the pooled connection inside a failed transaction
+            conn.close()
 
 
-def insert_application_logs(session_id, question, answer, model, processing_time=0.0):
-    with PerformanceTimer(db_logger, f"insert_logs:{session_id}"):
+def get_recent_chat_history(session_id, limit):
+    """Get the last `limit` turns of a session, oldest first, with their log IDs."""
+    with PerformanceTimer(db_logger, f"get_recent_chat_history:{session_id}"):
         try:
-            # Ensure the processing_time column exists
-            add_column_if_not_exists(
-                "application_logs", "processing_time", "REAL")
-
             conn = get_db_connection()
-            conn.execute('''INSERT INTO application_logs 
-                            (session_id, user_query, gpt_response, model, processing_time) 
-                            VALUES (?, ?, ?, ?, ?)''',
-                         (session_id, question, answer, model, processing_time))
-            conn.commit()
-            conn.close()
-            db_logger.info(f"Inserted log for session: {session_id}")
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT id, user_query, gpt_response FROM application_logs WHERE session_id = ? ORDER BY created_at DESC, id DESC LIMIT ?',
+                    (session_id, limit))
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+            return [{"id": row['id'], "question": row['user_query'], "answer": row['gpt_response']}
+                    for row in reversed(rows)]
         except Exception as e:
-            error_msg = f"Failed to insert application log: {str(e)}"
+            error_msg = f"Failed to retrieve recent chat history for session {session_id}: {str(e)}"
             db_logger.error(error_msg)
             error_logger.error(error_msg, exc_info=True)
-            raise
+            return []
 
 
-def get_chat_history(session_id):
-    with PerformanceTimer(db_logger, f"get_chat_history:{session_id}"):
+def get_chat_history_after(session_id, after_id, limit):
+    """Get up to `limit` turns of a session logged after log `after_id`, oldest first."""
+    with PerformanceTimer(db_logger, f"get_chat_history_after:{session_id}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT user_query, gpt_response FROM application_logs WHERE session_id = ? ORDER BY created_at', (session_id,))
-            history = []
-            for row in cursor.fetchall():
-                history.append({
-                    "question": row['user_query'],
-                    "answer": row['gpt_response']
-                })
-            conn.close()
-            db_logger.info(
-                f"Retrieved {len(history)} messages for session {session_id}")
-            return history
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT id, user_query, gpt_response FROM application_logs WHERE session_id = ? AND id > ? ORDER BY created_at, id LIMIT ?',
+                    (session_id, after_id, limit))
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+            return [{"id": row['id'], "question": row['user_query'], "answer": row['gpt_response']}
+                    for row in rows]
         except Exception as e:
             error_msg = f"Failed to retrieve chat history for session {session_id}: {str(e)}"
             db_logger.error(error_msg)
@@ -138,18 +200,67 @@ def get_chat_history(session_id):
             return []
 
 
-def create_document_store():
-    with PerformanceTimer(db_logger, "create_document_store"):
+def count_chat_turns_after(session_id, after_id):
+    """Count a session's turns logged after log `after_id`."""
+    try:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT COUNT(*) FROM application_logs WHERE session_id = ? AND id > ?',
+                (session_id, after_id))
+            count = cursor.fetchone()[0]
+        finally:
+            conn.close()
+        return count
+    except Exception as e:
+        error_msg = f"Failed to count chat turns for session {session_id}: {str(e)}"
+        db_logger.error(error_msg)
+        error_logger.error(error_msg, exc_info=True)
+        return 0
+
+
+def get_session_summary(session_id):
+    """Get a session's rolling summary and the last log ID folded into it."""
+    try:
+        conn = get_db_connection()
         try:
-            conn = get_db_connection()
-            conn.execute('''CREATE TABLE IF NOT EXISTS document_store
-                            (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                             filename TEXT,
-                             upload_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT summary, summarized_through FROM session_summaries WHERE session_id = ?',
+                (session_id,))
+            row = cursor.fetchone()
+        finally:
             conn.close()
-            db_logger.info("Document store table created or verified")
+        if row:
+            return {"summary": row['summary'], "summarized_through": row['summarized_through']}
+        return None
+    except Exception as e:
+        error_msg = f"Failed to get session summary for {session_id}: {str(e)}"
+        db_logger.error(error_msg)
+        error_logger.error(error_msg, exc_info=True)
+        return None
+
+
+def upsert_session_summary(session_id, summary, summarized_through):
+    with PerformanceTimer(db_logger, f"upsert_session_summary:{session_id}"):
+        try:
+            conn = get_db_connection()
+            try:
+                conn.execute('''INSERT INTO session_summaries (session_id, summary, summarized_through)
+                                VALUES (?, ?, ?)
+                                ON CONFLICT(session_id) DO UPDATE SET
+                                    summary = excluded.summary,
+                                    summarized_through = excluded.summarized_through,
+                                    updated_at = CURRENT_TIMESTAMP''',
+                             (session_id, summary, summarized_through))
+                conn.commit()
+            finally:
+                conn.close()
+            db_logger.info(
+                f"Updated summary for session {session_id} through log {summarized_through}")
         except Exception as e:
-            error_msg = f"Failed to create document store table: {str(e)}"
+            error_msg = f"Failed to update session summary for {session_id}: {str(e)}"
             db_logger.error(error_msg)
             error_logger.error(error_msg, exc_info=True)
             raise
@@ -159,30 +270,31 @@ def insert_document_record(filename):
     with PerformanceTimer(db_logger, f"insert_document:{filename}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
+            try:
+                cursor = conn.cursor()
 
-            # Check if file already exists
-            cursor.execute(
-                'SELECT id FROM document_store WHERE filename = ?', (filename,))
-            existing = cursor.fetchone()
+                # Check if file already exists
+                cursor.execute(
+                    'SELECT id FROM document_store WHERE filename = ?', (filename,))
+                existing = cursor.fetchone()
+
+                if existing:
+                    file_id = existing['id']
+                    # Update the timestamp to current time
+                    cursor.execute(
+                        'UPDATE document_store SET upload_timestamp = CURRENT_TIMESTAMP WHERE id = ?', (file_id,))
+                    conn.commit()
+                    db_logger.info(
+                        f"Document {filename} already exists with ID {file_id}, updated timestamp")
+                    return file_id
 
-            if existing:
-                file_id = existing['id']
-                # Update the timestamp to current time
+                # If not exists, insert new record
                 cursor.execute(
-                    'UPDATE document_store SET upload_timestamp = CURRENT_TIMESTAMP WHERE id = ?', (file_id,))
+                    'INSERT INTO document_store (filename) VALUES (?)', (filename,))
+                file_id = cursor.lastrowid
                 conn.commit()
-                db_logger.info(
-                    f"Document {filename} already exists with ID {file_id}, updated timestamp")
+            finally:
                 conn.close()
-                return file_id
-
-            # If not exists, insert new record
-            cursor.execute(
-                'INSERT INTO document_store (filename) VALUES (?)', (filename,))
-            file_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
             db_logger.info(
                 f"Inserted new document record: {filename} with ID {file_id}")
             return file_id
@@ -197,9 +309,11 @@ def delete_document_record(file_id):
     with PerformanceTimer(db_logger, f"delete_document:{file_id}"):
         try:
             conn = get_db_connection()
-            conn.execute('DELETE FROM document_store WHERE id = ?', (file_id,))
-            conn.commit()
-            conn.close()
+            try:
+                conn.execute('DELETE FROM document_store WHERE id = ?', (file_id,))
+                conn.commit()
+            finally:
+                conn.close()
             db_logger.info(f"Deleted document record with ID {file_id}")
             return True
         except Exception as e:
@@ -214,11 +328,13 @@ def get_all_documents():
     with PerformanceTimer(db_logger, "get_all_documents"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, filename, upload_timestamp FROM document_store ORDER BY upload_timestamp DESC")
-            documents = cursor.fetchall()
-            conn.close()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, filename, upload_timestamp FROM document_store ORDER BY upload_timestamp DESC")
+                documents = cursor.fetchall()
+            finally:
+                conn.close()
 
             result = []
             for doc in documents:
@@ -235,16 +351,77 @@ def get_all_documents():
             return []
 
 
+def encode_cursor(*values):
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, arity):
+    """Decode a cursor from encode_cursor; raises ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != arity:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def get_documents_page(limit, after=None):
+    """
+    Get one page of documents, newest first, using keyset pagination.
+
+    Args:
+        limit: Maximum number of documents to return
+        after: Cursor returned with the previous page, or None for the first page
+
+    Returns:
+        (documents, cursor for the next page or None)
+    """
+    with PerformanceTimer(db_logger, "get_documents_page"):
+        try:
+            conn = get_db_connection()
+            try:
+                if after is None:
+                    rows = conn.execute(
+                        "SELECT id, filename, upload_timestamp FROM document_store ORDER BY upload_timestamp DESC, id DESC LIMIT ?",
+                        (limit + 1,)).fetchall()
+                else:
+                    upload_timestamp, doc_id = decode_cursor(after, 2)
+                    rows = conn.execute(
+                        "SELECT id, filename, upload_timestamp FROM document_store WHERE (upload_timestamp, id) < (?, ?) ORDER BY upload_timestamp DESC, id DESC LIMIT ?",
+                        (upload_timestamp, doc_id, limit + 1)).fetchall()
+            finally:
+                conn.close()
+
+            documents = [{"id": row["id"], "filename": row["filename"], "upload_timestamp": row["upload_timestamp"]}
+                         for row in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit:
+                last = documents[-1]
+                next_cursor = encode_cursor(last["upload_timestamp"], last["id"])
+            return documents, next_cursor
+        except ValueError:
+            raise
+        except Exception as e:
+            error_msg = f"Failed to get documents page: {str(e)}"
+            db_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            raise
+
+
 def get_document_path(file_id):
     """Get the path of a document by its ID."""
     with PerformanceTimer(db_logger, f"get_document_path:{file_id}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT filename FROM document_store WHERE id = ?", (file_id,))
-            document = cursor.fetchone()
-            conn.close()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT filename FROM document_store WHERE id = ?", (file_id,))
+                document = cursor.fetchone()
+            finally:
+                conn.close()
 
             if document:
                 # First check if the file exists in the upload directory
@@ -275,21 +452,10 @@ def get_document_path(file_id):
             return None
 
 
-def create_users_table():
-    """Create users table if it doesn't exist."""
-    with PerformanceTimer(db_logger, "create_users_table"):
+def create_default_users():
+    """Create the default admin and user accounts if they don't exist."""
+    with PerformanceTimer(db_logger, "create_default_users"):
         try:
-            conn = get_db_connection()
-            conn.execute('''CREATE TABLE IF NOT EXISTS users
-                            (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                             username TEXT UNIQUE,
-                             password_hash TEXT,
-                             role TEXT,
-                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-            conn.commit()
-            conn.close()
-            db_logger.info("Users table created or verified")
-
             # Create default admin and user accounts if they don't exist
             if not get_user_by_username("admin"):
                 create_user("admin", "admin", "admin")
@@ -300,7 +466,7 @@ def create_users_table():
                 db_logger.info("Created default regular user")
 
         except Exception as e:
-            error_msg = f"Failed to create users table: {str(e)}"
+            error_msg = f"Failed to create default users: {str(e)}"
             db_logger.error(error_msg)
             error_logger.error(error_msg, exc_info=True)
             raise
@@ -323,31 +489,56 @@ def verify_password(stored_password, provided_password):
     return pwdhash == stored_hash
 
 
+def invalidate_user_cache(user_id=None, username=None):
+    """
+    Drop cached lookups for a user, by ID and/or username.
+
+    With no arguments the whole cache is cleared, for writes that may have
+    touched any user.
+    """
+    if user_id is None and username is None:
+        _user_cache.clear()
+        return
+    for key, user in _user_cache.items():
+        if (user_id is not None and str(user["id"]) == str(user_id)) or (
+                username is not None and user["username"] == username):
+            _user_cache.pop(key)
+    if username is not None:
+        _user_cache.pop(("username", username))
+
+
+def get_user_cache_stats():
+    """Hit-rate metrics for the user lookup cache."""
+    return _user_cache.stats()
+
+
 def create_user(username, password, role):
     """Create a new user in the database."""
     with PerformanceTimer(db_logger, f"create_user:{username}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
+            try:
+                cursor = conn.cursor()
 
-            # Check if username already exists
-            cursor.execute(
-                'SELECT id FROM users WHERE username = ?', (username,))
-            if cursor.fetchone():
-                conn.close()
-                return None, "Username already exists"
+                # Check if username already exists
+                cursor.execute(
+                    'SELECT id FROM users WHERE username = ?', (username,))
+                if cursor.fetchone():
+                    return None, "Username already exists"
 
-            # Hash the password
-            password_hash = hash_password(password)
+                # Hash the password
+                password_hash = hash_password(password)
 
-            # Insert the new user
-            cursor.execute(
-                'INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)',
-                (username, password_hash, role)
-            )
-            user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+                # Insert the new user
+                cursor.execute(
+                    'INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)',
+                    (username, password_hash, role)
+                )
+                user_id = cursor.lastrowid
+                conn.commit()
+            finally:
+                conn.close()
+            invalidate_user_cache(username=username)
 
             db_logger.info(f"Created new user: {username} with role {role}")
             return user_id, None
@@ -379,18 +570,24 @@ def authenticate_user(username, password):
 
 def get_user_by_username(username):
     """Get a user by username."""
+    cached = _user_cache.get(("username", username))
+    if cached is not None:
+        return dict(cached)
     with PerformanceTimer(db_logger, f"get_user_by_username:{username}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT id, username, password_hash, role FROM users WHERE username = ?',
-                (username,)
-            )
-            user = cursor.fetchone()
-            conn.close()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT id, username, password_hash, role FROM users WHERE username = ?',
+                    (username,)
+                )
+                user = cursor.fetchone()
+            finally:
+                conn.close()
 
             if user:
+                _user_cache.put(("username", username), dict(user))
                 return dict(user)
             return None
         except Exception as e:
@@ -402,18 +599,24 @@ def get_user_by_username(username):
 
 def get_user_by_id(user_id):
     """Get a user by ID."""
+    cached = _user_cache.get(("id", user_id))
+    if cached is not None:
+        return dict(cached)
     with PerformanceTimer(db_logger, f"get_user_by_id:{user_id}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT id, username, role FROM users WHERE id = ?',
-                (user_id,)
-            )
-            user = cursor.fetchone()
-            conn.close()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT id, username, role FROM users WHERE id = ?',
+                    (user_id,)
+                )
+                user = cursor.fetchone()
+            finally:
+                conn.close()
 
             if user:
+                _user_cache.put(("id", user_id), dict(user))
                 return dict(user)
             return None
         except Exception as e:
@@ -428,22 +631,24 @@ def modify_username(user_id, new_username):
     with PerformanceTimer(db_logger, f"modify_username:{user_id}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
+            try:
+                cursor = conn.cursor()
 
-            # Check if new username already exists
-            cursor.execute('SELECT id FROM users WHERE username = ? AND id != ?',
-                           (new_username, user_id))
-            if cursor.fetchone():
-                conn.close()
-                return False, "Username already exists"
+                # Check if new username already exists
+                cursor.execute('SELECT id FROM users WHERE username = ? AND id != ?',
+                               (new_username, user_id))
+                if cursor.fetchone():
+                    return False, "Username already exists"
 
-            # Update the username
-            cursor.execute(
-                'UPDATE users SET username = ? WHERE id = ?',
-                (new_username, user_id)
-            )
-            conn.commit()
-            conn.close()
+                # Update the username
+                cursor.execute(
+                    'UPDATE users SET username = ? WHERE id = ?',
+                    (new_username, user_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            invalidate_user_cache(user_id=user_id, username=new_username)
 
             if cursor.rowcount > 0:
                 db_logger.info(
@@ -463,10 +668,13 @@ def delete_user(user_id):
     with PerformanceTimer(db_logger, f"delete_user:{user_id}"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-            conn.commit()
-            conn.close()
+            try:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
+                conn.commit()
+            finally:
+                conn.close()
+            invalidate_user_cache(user_id=user_id)
 
             if cursor.rowcount > 0:
                 db_logger.info(f"Deleted user with ID {user_id}")
@@ -480,6 +688,33 @@ def delete_user(user_id):
             return False, str(e)
 
 
+def update_user_password(user_id, new_password):
+    """Set a new password for a user."""
+    with PerformanceTimer(db_logger, f"update_user_password:{user_id}"):
+        try:
+            conn = get_db_connection()
+            try:
+                cursor = conn.execute(
+                    'UPDATE users SET password_hash = ? WHERE id = ?',
+                    (hash_password(new_password), user_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            invalidate_user_cache(user_id=user_id)
+
+            if cursor.rowcount > 0:
+                db_logger.info(f"Changed password for user ID {user_id}")
+                return True, None
+            else:
+                return False, "User not found"
+        except Exception as e:
+            error_msg = f"Failed to change password for user ID {user_id}: {str(e)}"
+            db_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            return False, str(e)
+
+
 def get_all_users():
     """
     Retrieve all users from the database.
@@ -490,12 +725,15 @@ def get_all_users():
     with PerformanceTimer(db_logger, "get_all_users"):
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-
-            # For security, we don't return passwords
-            cursor.execute("SELECT id, username, role FROM users")
-            users = [{"id": row[0], "username": row[1], "role": row[2]}
-                     for row in cursor.fetchall()]
+            try:
+                cursor = conn.cursor()
+
+                # For security, we don't return passwords
+                cursor.execute("SELECT id, username, role FROM users")
+                users = [{"id": row[0], "username": row[1], "role": row[2]}
+                         for row in cursor.fetchall()]
+            finally:
+                conn.close()
 
             return users
         except Exception as e:
@@ -504,11 +742,52 @@ def get_all_users():
             return []
 
 
+def get_users_page(limit, after=None):
+    """
+    Get one page of users in ID order, using keyset pagination.
+
+    Returns:
+        (users, cursor for the next page or None)
+    """
+    with PerformanceTimer(db_logger, "get_users_page"):
+        try:
+            conn = get_db_connection()
+            try:
+                after_id = decode_cursor(after, 1)[0] if after is not None else 0
+                # For security, we don't return passwords
+                rows = conn.execute(
+                    "SELECT id, username, role FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                    (after_id, limit + 1)).fetchall()
+            finally:
+                conn.close()
+
+            users = [{"id": row["id"], "username": row["username"], "role": row["role"]}
+                     for row in rows[:limit]]
+            next_cursor = encode_cursor(users[-1]["id"]) if len(rows) > limit else None
+            return users, next_cursor
+        except ValueError:
+            raise
+        except Exception as e:
+            error_msg = f"Failed to get users page: {str(e)}"
+            db_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            raise
+
+
+def initialize_database():
+    """Apply pending schema migrations and seed the default accounts."""
+    with PerformanceTimer(db_logger, "initialize_database"):
+        conn = get_db_connection()
+        try:
+            apply_migrations(conn)
+        finally:
+            conn.close()
+        create_default_users()
+
+
 # Initialize the database tables
 try:
-    create_application_logs()
-    create_document_store()
-    create_users_table()
+    initialize_database()
     db_logger.info("Database tables initialized successfully")
 except Exception as e:
     error_msg = f"Failed to initialize database tables: {str(e)}"
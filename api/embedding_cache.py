@@ -0,0 +1,160 @@
+"""
+Query-embedding cache for the retrieval path.
+
+Embedding a query through GoogleGenerativeAIEmbeddings is a network round
+trip. CachedQueryEmbeddings wraps the embedding model and keeps query
+embeddings in an in-process LRU keyed by (task type, normalized text).
+Optionally, an SQLite file shared by all workers backs the LRU, so a
+question embedded by one process is not embedded again by another.
+Document embeddings pass straight through because every chunk is embedded
+only once, at ingest.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from cache_utils import TTLCache
+from logger import model_logger, error_logger
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query_text(text: str) -> str:
+    """Collapse whitespace; the embedding is otherwise sensitive to the exact text."""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class QueryEmbeddingStore:
+    """On-disk store of query embeddings shared between processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS query_embeddings
+                         (task_type TEXT NOT NULL,
+                          text TEXT NOT NULL,
+                          embedding BLOB NOT NULL,
+                          PRIMARY KEY (task_type, text))''')
+        self._conn.commit()
+
+    def get(self, task_type: str, text: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT embedding FROM query_embeddings WHERE task_type = ? AND text = ?',
+                (task_type, text)).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put(self, task_type: str, text: str, embedding: List[float]) -> None:
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO query_embeddings (task_type, text, embedding) VALUES (?, ?, ?)',
+                (task_type, text, blob))
+            self._conn.commit()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embeddings wrapper that caches embed_query results."""
+
+    def __init__(self, base: Embeddings, maxsize: int = 4096,
+                 store: Optional[QueryEmbeddingStore] = None):
+        self.base = base
+        self.store = store
+        self.task_type = getattr(base, "task_type", None) or "retrieval_query"
+        self._memory = TTLCache(maxsize=maxsize)
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _cached(self, text: str) -> Optional[List[float]]:
+        embedding = self._memory.get(text)
+        if embedding is not None or self.store is None:
+            return embedding
+        try:
+            embedding = self.store.get(self.task_type, text)
+        except sqlite3.Error as e:
+            error_logger.error(
+                f"Error reading query embedding store: {str(e)}", exc_info=True)
+            return None
+        if embedding is not None:
+            self.disk_hits += 1
+            self._memory.put(text, embedding)
+        return embedding
+
+    def _remember(self, text: str, embedding: List[float]) -> None:
+        self.misses += 1
+        self._memory.put(text, embedding)
+        if self.store is not None:
+            try:
+                self.store.put(self.task_type, text, embedding)
+            except sqlite3.Error as e:
+                error_logger.error(
+                    f"Error writing query embedding store: {str(e)}", exc_info=True)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query_text(text)
+        embedding = self._cached(key)
+        if embedding is None:
+            embedding = self.base.embed_query(key)
+            self._remember(key, embedding)
+        return embedding
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = normalize_query_text(text)
+        embedding = self._cached(key)
+        if embedding is None:
+            embedding = await self.base.aembed_query(key)
+            self._remember(key, embedding)
+        return embedding
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.base.aembed_documents(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics across the memory and disk tiers."""
+        memory = self._memory.stats()
+        memory_hits = memory["hits"]
+        lookups = memory_hits + memory["misses"]
+        return {
+            "task_type": self.task_type,
+            "size": memory["size"],
+            "maxsize": memory["maxsize"],
+            "memory_hits": memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "disk_store": self.store.path if self.store is not None else None
+        }
+
+
+def cached_query_embeddings(base: Embeddings) -> CachedQueryEmbeddings:
+    """
+    Wrap an embedding model with the query cache configured from the environment.
+
+    QUERY_EMBEDDING_CACHE_SIZE sets the in-process LRU size and
+    QUERY_EMBEDDING_CACHE_PATH, if set, enables the shared on-disk store.
+    """
+    store = None
+    path = os.getenv("QUERY_EMBEDDING_CACHE_PATH")
+    if path:
+        try:
+            store = QueryEmbeddingStore(path)
+            model_logger.info(f"Query embedding store: {path}")
+        except sqlite3.Error as e:
+            error_logger.error(
+                f"Could not open query embedding store {path}: {str(e)}", exc_info=True)
+    return CachedQueryEmbeddings(
+        base,
+        maxsize=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096")),
+        store=store
+    )
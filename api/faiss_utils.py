@@ -12,10 +12,13 @@ import base64
 from datetime import datetime
 import traceback
 import shutil
+import threading
 from dotenv import load_dotenv
 from PIL import Image
 from io import BytesIO
 from logger import model_logger, error_logger, PerformanceTimer
+from embedding_cache import cached_query_embeddings
+from chunk_store import ChunkDocstore, copy_without_vectors, get_chunk_docstore
 
 # Load environment variables
 load_dotenv()
@@ -34,15 +37,25 @@ model_logger.info(f"FAISS DB path: {faiss_db_path}")
 collection_path = os.path.join(faiss_db_path, "document_collection")
 os.makedirs(collection_path, exist_ok=True)
 
-# File ID to document mapping for deletion tracking
-file_id_mapping = {}
+# Chunk IDs are dense integers assigned at ingest. They are stored in each
+# chunk's metadata and used as the docstore ID in the FAISS ID map, so every
+# retrieval and fusion stage can join on them. Chunk text and metadata live
+# in the chunks table (chunk_store), keyed by chunk ID.
+_chunk_id_lock = threading.Lock()
+_next_chunk_id = 0
+
+# Bumped whenever the indexed corpus changes. Anything built on top of the
+# index (RAG chains, retrievers) is keyed on it and rebuilt when it moves.
+_index_generation_lock = threading.Lock()
+index_generation = 0
 
 try:
-    embedding_function = GoogleGenerativeAIEmbeddings(
+    # Query embeddings are cached; document embeddings pass straight through
+    embedding_function = cached_query_embeddings(GoogleGenerativeAIEmbeddings(
         model="models/embedding-001",
         google_api_key=os.getenv("GEMINI_API_KEY"),
         task_type="retrieval_document"
-    )
+    ))
     model_logger.info("Embedding function initialized")
 except Exception as e:
     error_logger.error(
@@ -67,8 +80,8 @@ try:
                       metadata={"init": True})],
             embedding_function
         )
-        # Save the initial index
-        vectorstore.save_local(collection_path)
+        # Chunks left over from a previous index have no vectors any more
+        get_chunk_docstore().clear()
         model_logger.info("New FAISS vector store initialized")
 except Exception as e:
     error_logger.error(
@@ -76,6 +89,87 @@ except Exception as e:
     raise
 
 
+def _adopt_chunk_docstore(store: FAISS) -> None:
+    """
+    Move an in-memory docstore into the chunks table and save the index.
+
+    Runs once for a new index or one saved before the chunk store existed.
+    Chunks indexed before chunk IDs existed are given one now.
+    """
+    chunk_docstore = get_chunk_docstore()
+    documents = {}
+    legacy = []
+    for position, docstore_id in store.index_to_docstore_id.items():
+        doc = store.docstore.search(docstore_id)
+        # The placeholder that seeds an empty index is never retrieved
+        if not isinstance(doc, Document) or doc.metadata.get("init"):
+            continue
+        if doc.metadata.get("chunk_id") is None:
+            legacy.append((position, doc))
+        else:
+            documents[position] = doc
+
+    next_id = max([chunk_docstore.max_chunk_id()] +
+                  [doc.metadata["chunk_id"] for doc in documents.values()]) + 1
+    for offset, (position, doc) in enumerate(legacy):
+        doc.metadata["chunk_id"] = next_id + offset
+        documents[position] = doc
+
+    chunk_docstore.add(
+        {str(doc.metadata["chunk_id"]): doc for doc in documents.values()})
+    # Positions without a chunk keep an ID the chunk store will not find
+    store.index_to_docstore_id = {
+        position: str(documents[position].metadata["chunk_id"]) if position in documents else docstore_id
+        for position, docstore_id in store.index_to_docstore_id.items()
+    }
+    store.docstore = chunk_docstore
+    store.save_local(collection_path)
+    model_logger.info(
+        f"Moved {len(documents)} chunks into the chunk store ({len(legacy)} given new chunk IDs)")
+
+
+if not isinstance(vectorstore.docstore, ChunkDocstore):
+    _adopt_chunk_docstore(vectorstore)
+
+_next_chunk_id = get_chunk_docstore().max_chunk_id() + 1
+model_logger.info(f"Next chunk ID: {_next_chunk_id}")
+
+
+def get_vectorstore() -> FAISS:
+    """Return the current vector store (it is replaced when documents are deleted)."""
+    return vectorstore
+
+
+def get_query_embedding_stats() -> Dict:
+    """Return hit-rate metrics for the query embedding cache."""
+    return embedding_function.stats()
+
+
+def get_index_generation() -> int:
+    """Return the current index generation."""
+    return index_generation
+
+
+def _bump_index_generation() -> int:
+    global index_generation
+    with _index_generation_lock:
+        index_generation += 1
+        model_logger.info(f"Index generation is now {index_generation}")
+        return index_generation
+
+
+def assign_chunk_ids(docs: List[Document]) -> List[int]:
+    """Assign consecutive chunk IDs to documents and record them in metadata."""
+    global _next_chunk_id
+    with _chunk_id_lock:
+        start = _next_chunk_id
+        _next_chunk_id += len(docs)
+    chunk_ids = list(range(start, start + len(docs)))
+    for doc, chunk_id in zip(docs, chunk_ids):
+        doc.metadata["chunk_id"] = chunk_id
+    return chunk_ids
+
+
 def extract_images_pymupdf(pdf_path: str, output_dir: str) -> List[Dict]:
     """Extract images from PDF using PyMuPDF"""
     with PerformanceTimer(model_logger, f"extract_images_pymupdf:{os.path.basename(pdf_path)}"):
@@ -388,14 +482,18 @@ def index_document_to_faiss(file_path: str, file_id: int) -> bool:
                 f"Indexing {len(all_docs)} total documents to FAISS")
 
             if all_docs:
+                # Give every chunk a stable integer ID, used as its FAISS docstore ID
+                chunk_ids = assign_chunk_ids(all_docs)
+                model_logger.info(
+                    f"Assigned chunk IDs {chunk_ids[0]}-{chunk_ids[-1]} to document {file_id}")
+
                 # Add documents to the vector store
-                vectorstore.add_documents(all_docs)
+                vectorstore.add_documents(
+                    all_docs, ids=[str(chunk_id) for chunk_id in chunk_ids])
 
                 # Save the updated index
                 vectorstore.save_local(collection_path)
-
-                # Store the documents for this file ID for potential deletion later
-                file_id_mapping[file_id] = all_docs
+                _bump_index_generation()
 
                 model_logger.info(
                     f"Successfully indexed document {file_path} (ID: {file_id})")
@@ -413,47 +511,36 @@ def index_document_to_faiss(file_path: str, file_id: int) -> bool:
 
 
 def delete_doc_from_faiss(file_id: int) -> bool:
-    """Delete documents by file_id by rebuilding the index without those documents"""
+    """Delete a file's chunks and their vectors from the index"""
     with PerformanceTimer(model_logger, f"delete_from_faiss:{file_id}"):
         try:
             model_logger.info(f"Deleting document ID {file_id} from FAISS")
 
-            # FAISS doesn't support direct deletion, so we need to:
-            # 1. Get all documents from the current index
-            # 2. Filter out documents with the specified file_id
-            # 3. Create a new index with the remaining documents
-
-            # Get all documents (this is a simplified approach - in a real app,
-            # you might need to store document metadata separately)
-            all_docs = []
-            for doc_file_id, docs in file_id_mapping.items():
-                if doc_file_id != file_id:
-                    all_docs.extend(docs)
-
-            if not all_docs:
-                # If there are no documents left, initialize with an empty document
-                all_docs = [
-                    Document(page_content="Initialization document", metadata={"init": True})]
-
-            # Create a new vector store with the filtered documents
-            new_vectorstore = FAISS.from_documents(
-                all_docs,
-                embedding_function
-            )
+            # The file's chunk IDs come from an indexed lookup on the chunk store
+            chunk_ids = get_chunk_docstore().file_chunk_ids(file_id)
+            if not chunk_ids:
+                model_logger.warning(
+                    f"Document ID {file_id} has no indexed chunks")
+                return True
+
+            # Remove the vectors from a copy of the index, so requests still
+            # searching the current one are not affected; nothing is re-embedded
+            global vectorstore
+            new_vectorstore = copy_without_vectors(vectorstore, chunk_ids)
 
             # Save the new index, replacing the old one
             new_vectorstore.save_local(collection_path)
 
             # Update the global vectorstore reference
-            global vectorstore
             vectorstore = new_vectorstore
+            _bump_index_generation()
 
-            # Remove the file_id from our mapping
-            if file_id in file_id_mapping:
-                del file_id_mapping[file_id]
+            # Drop the chunks only once new searches no longer reach them;
+            # if saving failed above, the old index and its chunks stay intact
+            get_chunk_docstore().delete(chunk_ids)
 
             model_logger.info(
-                f"Successfully deleted document ID {file_id} from FAISS")
+                f"Successfully deleted document ID {file_id} ({len(chunk_ids)} chunks) from FAISS")
             return True
 
         except Exception as e:
@@ -478,8 +565,8 @@ def clean_faiss_db_except_current(current_file_id: int, clean_db: bool = False)
         model_logger.info(
             f"Cleaning FAISS DB except for document ID: {current_file_id}")
 
-        # Get all document IDs in the database
-        all_ids = list(file_id_mapping.keys())
+        # Get the IDs of all indexed documents
+        all_ids = get_chunk_docstore().file_ids()
 
         # Remove all documents except the current one
         for file_id in all_ids:
@@ -0,0 +1,177 @@
+"""
+Result fusion for hybrid search.
+
+Combines the vector and keyword legs of a hybrid query. Both legs are given
+as integer document IDs in rank order plus (optionally) their raw scores,
+and all fusion methods are computed with NumPy over the union of IDs:
+
+- rrf:      Reciprocal Rank Fusion, 1 / (rank + k) summed over legs
+- weighted: weighted rank fusion, weight * (1 - rank / n)
+- minmax:   per-leg min-max normalized scores, weighted sum
+- zscore:   per-leg z-score normalized scores, weighted sum
+- convex:   alpha * vector + (1 - alpha) * keyword on bounded raw scores,
+            with alpha = weight_vector / (weight_vector + weight_keyword)
+
+Score-based methods expect "higher is better" scores. When a leg has no
+scores, its scores are derived from rank so every method still works.
+"""
+
+from typing import Optional
+import numpy as np
+
+FUSION_METHODS = ("rrf", "weighted", "minmax", "zscore", "convex")
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k highest scores, best first.
+
+    Uses argpartition so selection is O(n) and only the k winners are sorted.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class FusedResult:
+    """Fused top-k: document IDs, fused scores and the rank in each leg (-1 if absent)."""
+
+    __slots__ = ("ids", "scores", "vector_ranks", "keyword_ranks")
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray,
+                 vector_ranks: np.ndarray, keyword_ranks: np.ndarray):
+        self.ids = ids
+        self.scores = scores
+        self.vector_ranks = vector_ranks
+        self.keyword_ranks = keyword_ranks
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+
+def _rank_scores(n: int) -> np.ndarray:
+    """Scores in (0, 1] derived from rank order, for legs without raw scores."""
+    return 1.0 - np.arange(n, dtype=np.float64) / max(n, 1)
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    if scores.size == 0:
+        return scores
+    low, high = scores.min(), scores.max()
+    if high - low <= 1e-12:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+def _z_score(scores: np.ndarray) -> np.ndarray:
+    if scores.size == 0:
+        return scores
+    std = scores.std()
+    if std <= 1e-12:
+        return np.zeros_like(scores)
+    return (scores - scores.mean()) / std
+
+
+def _leg_contributions(
+    method: str,
+    scores: np.ndarray,
+    weight: float,
+    alpha: float,
+    rrf_k: int,
+    bounded: bool
+) -> np.ndarray:
+    """Per-document contribution of one leg, in that leg's rank order."""
+    n = scores.shape[0]
+    if method == "rrf":
+        return 1.0 / (np.arange(n, dtype=np.float64) + rrf_k)
+    if method == "weighted":
+        return weight * _rank_scores(n)
+    if method == "minmax":
+        return weight * _min_max(scores)
+    if method == "zscore":
+        return weight * _z_score(scores)
+    if method == "convex":
+        # Keyword scores (BM25) are unbounded, so squash them into [0, 1)
+        # without looking at the rest of the result set.
+        bounded_scores = scores if bounded else scores / (scores + 1.0)
+        return alpha * np.clip(bounded_scores, 0.0, 1.0)
+    raise ValueError(
+        f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+
+
+def fuse(
+    vector_ids: np.ndarray,
+    keyword_ids: np.ndarray,
+    vector_scores: Optional[np.ndarray] = None,
+    keyword_scores: Optional[np.ndarray] = None,
+    method: str = "rrf",
+    top_k: int = 5,
+    weight_vector: float = 0.6,
+    weight_keyword: float = 0.4,
+    rrf_k: int = 60
+) -> FusedResult:
+    """
+    Fuse two ranked ID lists into a single top-k.
+
+    Args:
+        vector_ids: Document IDs from vector search, best first
+        keyword_ids: Document IDs from keyword search, best first
+        vector_scores: Similarity scores for vector_ids (higher is better, in [0, 1] for convex)
+        keyword_scores: BM25-style scores for keyword_ids (higher is better)
+        method: One of FUSION_METHODS
+        top_k: The number of fused results to return
+        weight_vector: The weight given to the vector leg
+        weight_keyword: The weight given to the keyword leg
+        rrf_k: The k parameter for RRF
+
+    Returns:
+        A FusedResult holding the top-k IDs, fused scores and per-leg ranks
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(
+            f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+
+    vector_ids = np.asarray(vector_ids, dtype=np.int64)
+    keyword_ids = np.asarray(keyword_ids, dtype=np.int64)
+    if vector_scores is None:
+        vector_scores = _rank_scores(vector_ids.shape[0])
+    if keyword_scores is None:
+        keyword_scores = _rank_scores(keyword_ids.shape[0])
+    vector_scores = np.asarray(vector_scores, dtype=np.float64)
+    keyword_scores = np.asarray(keyword_scores, dtype=np.float64)
+
+    total_weight = weight_vector + weight_keyword
+    alpha = weight_vector / total_weight if total_weight > 0 else 0.5
+
+    vector_contrib = _leg_contributions(
+        method, vector_scores, weight_vector, alpha, rrf_k, bounded=True)
+    keyword_contrib = _leg_contributions(
+        method, keyword_scores, weight_keyword, 1.0 - alpha, rrf_k, bounded=False)
+
+    # Join the legs on document ID: every ID gets a dense slot in the union
+    n_vector = vector_ids.shape[0]
+    union_ids, inverse = np.unique(
+        np.concatenate([vector_ids, keyword_ids]), return_inverse=True)
+    vector_slots = inverse[:n_vector]
+    keyword_slots = inverse[n_vector:]
+
+    m = union_ids.shape[0]
+    fused = np.bincount(vector_slots, weights=vector_contrib, minlength=m) + \
+        np.bincount(keyword_slots, weights=keyword_contrib, minlength=m)
+
+    vector_ranks = np.full(m, -1, dtype=np.int64)
+    vector_ranks[vector_slots] = np.arange(n_vector)
+    keyword_ranks = np.full(m, -1, dtype=np.int64)
+    keyword_ranks[keyword_slots] = np.arange(keyword_ids.shape[0])
+
+    order = top_k_indices(fused, top_k)
+    return FusedResult(
+        ids=union_ids[order],
+        scores=fused[order],
+        vector_ranks=vector_ranks[order],
+        keyword_ranks=keyword_ranks[order]
+    )
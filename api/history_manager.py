@@ -0,0 +1,129 @@
+"""
+Bounded chat history with a rolling summary.
+
+Only the last few turns of a session are passed to the prompts verbatim.
+Older turns are folded, a batch at a time, into a per-session summary kept
+in the session_summaries table, so both the DB read and the prompt stay
+bounded however long the session gets.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from db_utils import (get_recent_chat_history, get_chat_history_after, count_chat_turns_after,
+                      get_session_summary, upsert_session_summary)
+from logger import db_logger, error_logger
+
+# Most turns folded into the summary by one update
+MAX_TURNS_PER_SUMMARY = 50
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You maintain a running summary of a conversation between a user and an assistant about their documents.
+    Update the summary with the new turns. Keep facts, names and open questions the user may refer back to.
+    Reply with the updated summary only, in at most 200 words."""),
+    ("human", "Current summary:\n{summary}\n\nNew turns:\n{turns}")
+])
+
+
+def summarize_with_llm(llm: BaseLanguageModel, summary: Optional[str], turns: List[Dict]) -> str:
+    """Fold chat turns into an existing summary with an LLM."""
+    transcript = "\n".join(
+        f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in turns)
+    chain = SUMMARY_PROMPT | llm | StrOutputParser()
+    return chain.invoke({"summary": summary or "(none)", "turns": transcript})
+
+
+class HistoryManager:
+    """Loads windowed history and keeps each session's summary up to date."""
+
+    def __init__(
+        self,
+        summarize: Callable[[Optional[str], List[Dict]], str],
+        window_turns: int = 6,
+        summary_batch: int = 4
+    ):
+        """
+        Args:
+            summarize: Folds turns into a summary: (summary or None, turns) -> summary
+            window_turns: Turns passed to the prompts verbatim
+            summary_batch: Turns that must fall out of the window before they are summarized
+        """
+        self.summarize = summarize
+        self.window_turns = window_turns
+        self.summary_batch = summary_batch
+        self._updating = set()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> List[tuple]:
+        """
+        Return the session's history as (role, message) tuples for the prompts.
+
+        The summary comes first, followed by every turn it does not cover.
+        Turns not yet summarized are kept verbatim, so at most
+        window_turns + summary_batch turns are read.
+        """
+        state = get_session_summary(session_id)
+        summarized_through = state["summarized_through"] if state else 0
+        turns = get_recent_chat_history(
+            session_id, self.window_turns + self.summary_batch)
+
+        history = []
+        if state and state["summary"]:
+            history.append(
+                ("ai", f"Summary of our earlier conversation: {state['summary']}"))
+        for turn in turns:
+            if turn["id"] > summarized_through:
+                history.append(("human", turn["question"]))
+                history.append(("ai", turn["answer"]))
+        return history
+
+    def update(self, session_id: str) -> bool:
+        """
+        Fold turns that have left the window into the summary, once there are enough.
+
+        Blocking (DB and LLM calls); run it after the response is sent.
+
+        Returns:
+            True if the summary was updated
+        """
+        with self._lock:
+            if session_id in self._updating:
+                return False
+            self._updating.add(session_id)
+        try:
+            state = get_session_summary(session_id)
+            summarized_through = state["summarized_through"] if state else 0
+            overflow = count_chat_turns_after(
+                session_id, summarized_through) - self.window_turns
+            if overflow < self.summary_batch:
+                return False
+
+            turns = get_chat_history_after(
+                session_id, summarized_through, min(overflow, MAX_TURNS_PER_SUMMARY))
+            if not turns:
+                return False
+            summary = self.summarize(state["summary"] if state else None, turns)
+            upsert_session_summary(session_id, summary, turns[-1]["id"])
+            db_logger.info(
+                f"Summarized {len(turns)} turns for session {session_id}")
+            return True
+        except Exception as e:
+            error_msg = f"Failed to update summary for session {session_id}: {str(e)}"
+            db_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            return False
+        finally:
+            with self._lock:
+                self._updating.discard(session_id)
+
+
+def history_manager_from_env(summarize: Callable[[Optional[str], List[Dict]], str]) -> HistoryManager:
+    """Build a HistoryManager sized by HISTORY_WINDOW_TURNS and HISTORY_SUMMARY_BATCH."""
+    return HistoryManager(
+        summarize,
+        window_turns=int(os.getenv("HISTORY_WINDOW_TURNS", "6")),
+        summary_batch=int(os.getenv("HISTORY_SUMMARY_BATCH", "4"))
+    )
@@ -3,7 +3,7 @@ Hybrid Search Implementation for RAG System
 
 This module implements a hybrid search approach combining:
 1. Vector search (FAISS) for semantic similarity
-2. BM25 for keyword-based relevance
+2. BM25 for keyword-based relevance, in memory or through SQLite FTS5
 3. Result fusion using Reciprocal Rank Fusion (RRF)
 
 The hybrid approach provides better retrieval performance by leveraging
@@ -12,21 +12,86 @@ both semantic understanding and keyword matching.
 
 import os
 import time
+import asyncio
 import numpy as np
 import re
-from typing import List, Dict, Any, Optional, Callable
+import faiss
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from rank_bm25 import BM25Okapi
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
-from langchain_core.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain_core.callbacks.manager import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
 from langchain_community.vectorstores.faiss import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from fusion import FUSION_METHODS, fuse, top_k_indices
+from metadata_filter import MetadataFilter, faiss_search_params
+from mmr import mmr_select
+from embedding_cache import cached_query_embeddings
+from keyword_index import FTS5KeywordIndex, keyword_index_if_available
 from logger import model_logger, error_logger, PerformanceTimer
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Keyword search engines selectable in create_hybrid_retriever_from_faiss
+KEYWORD_BACKENDS = ("bm25", "fts5")
+
+# Per-request retrieval options. RAG chains are built once and shared across
+# requests, so request-specific settings reach the retrievers through here.
+_retrieval_options: ContextVar[Dict[str, Any]] = ContextVar(
+    "retrieval_options", default={})
+
+
+@contextmanager
+def retrieval_options(
+    fusion_method: Optional[str] = None,
+    metadata_filter: Optional[MetadataFilter] = None
+):
+    """Apply a fusion method and/or metadata filter to retrievals in this context."""
+    token = _retrieval_options.set({
+        "fusion_method": fusion_method,
+        "metadata_filter": metadata_filter
+    })
+    try:
+        yield
+    finally:
+        _retrieval_options.reset(token)
+
+
+class ScoredHits:
+    """Lightweight retrieval result: corpus row indices and their scores.
+
+    Retrieval stages pass these around instead of Document copies; Documents
+    are only built once, when results leave the retriever.
+    """
+
+    __slots__ = ("indices", "scores")
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray):
+        self.indices = indices
+        self.scores = scores
+
+    @classmethod
+    def empty(cls) -> "ScoredHits":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return int(self.indices.shape[0])
+
+    def to_documents(self, documents: List[Document], score_key: str) -> List[Document]:
+        """Materialize the hits as Documents with the score stored in metadata."""
+        return [
+            Document(
+                page_content=documents[idx].page_content,
+                metadata={**documents[idx].metadata, score_key: float(score)}
+            )
+            for idx, score in zip(self.indices.tolist(), self.scores.tolist())
+        ]
+
 
 class CustomBM25Retriever:
     """Custom BM25 retriever for keyword-based search."""
@@ -45,6 +110,9 @@ class CustomBM25Retriever:
 
         # Initialize BM25
         self.bm25 = BM25Okapi(self.corpus)
+
+        # Compiled metadata filters: filter key -> eligible corpus rows
+        self._filter_cache = {}
         model_logger.info(
             f"BM25 retriever initialized with {len(documents)} documents")
 
@@ -58,31 +126,45 @@ class CustomBM25Retriever:
         tokens = text.split()
         return tokens
 
-    def get_relevant_documents(self, query: str) -> List[Document]:
+    def _eligible_rows(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """Corpus rows matching a metadata filter, compiled once per filter."""
+        rows = self._filter_cache.get(metadata_filter.key)
+        if rows is None:
+            rows = np.flatnonzero(metadata_filter.mask(self.documents))
+            if len(self._filter_cache) >= 64:
+                self._filter_cache.clear()
+            self._filter_cache[metadata_filter.key] = rows
+        return rows
+
+    def search(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> ScoredHits:
+        """Score the corpus against the query and return the top k hits.
+
+        With a metadata filter, only the eligible chunks are scored.
+        """
+        query_tokens = self._preprocess_text(query)
+
+        if metadata_filter is None:
+            rows = None
+            scores = np.asarray(self.bm25.get_scores(query_tokens))
+        else:
+            rows = self._eligible_rows(metadata_filter)
+            if rows.size == 0:
+                return ScoredHits.empty()
+            scores = np.asarray(
+                self.bm25.get_batch_scores(query_tokens, rows.tolist()))
+
+        top_indices = top_k_indices(scores, self.top_k)
+        # Only keep documents with non-zero scores
+        top_indices = top_indices[scores[top_indices] > 0]
+        indices = top_indices if rows is None else rows[top_indices]
+        return ScoredHits(indices, scores[top_indices])
+
+    def get_relevant_documents(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
         """Get documents relevant to the query using BM25."""
         try:
             with PerformanceTimer(model_logger, "BM25 retrieval"):
-                # Preprocess query
-                query_tokens = self._preprocess_text(query)
-
-                # Get BM25 scores
-                scores = self.bm25.get_scores(query_tokens)
-
-                # Get top k document indices
-                top_indices = np.argsort(scores)[::-1][:self.top_k]
-
-                # Return top documents with scores in metadata
-                results = []
-                for idx in top_indices:
-                    if scores[idx] > 0:  # Only include documents with non-zero scores
-                        doc = self.documents[idx]
-                        # Add BM25 score to metadata
-                        doc_with_score = Document(
-                            page_content=doc.page_content,
-                            metadata={**doc.metadata,
-                                      "bm25_score": float(scores[idx])}
-                        )
-                        results.append(doc_with_score)
+                hits = self.search(query, metadata_filter)
+                results = hits.to_documents(self.documents, "bm25_score")
 
                 model_logger.info(
                     f"BM25 retrieved {len(results)} documents for query: {query[:50]}...")
@@ -94,6 +176,200 @@ class CustomBM25Retriever:
             return []
 
 
+class CustomFTS5Retriever:
+    """Keyword retriever over the disk-backed FTS5 index, ranked by bm25()."""
+
+    def __init__(self, index: FTS5KeywordIndex, top_k: int = 5):
+        self.index = index
+        self.top_k = top_k
+        model_logger.info(f"FTS5 retriever initialized with top_k={top_k}")
+
+    def search(
+        self, query: str, metadata_filter: Optional[MetadataFilter] = None
+    ) -> Tuple[List[Document], np.ndarray]:
+        """Return the top k matching chunks and their scores, best first."""
+        hits = self.index.search(query, self.top_k, metadata_filter)
+        return ([doc for doc, _ in hits],
+                np.asarray([score for _, score in hits], dtype=np.float32))
+
+    def get_relevant_documents(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """Get documents relevant to the query using FTS5."""
+        try:
+            with PerformanceTimer(model_logger, "FTS5 retrieval"):
+                docs, scores = self.search(query, metadata_filter)
+                results = [
+                    Document(page_content=doc.page_content,
+                             metadata={**doc.metadata, "bm25_score": score})
+                    for doc, score in zip(docs, scores.tolist())
+                ]
+
+                model_logger.info(
+                    f"FTS5 retrieved {len(results)} documents for query: {query[:50]}...")
+                return results
+        except Exception as e:
+            error_msg = f"Error in FTS5 retrieval: {str(e)}"
+            model_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            return []
+
+
+class CustomVectorRetriever:
+    """Vector retriever that searches the FAISS index directly.
+
+    Going to the index (rather than through FAISS.as_retriever) lets metadata
+    filters run inside FAISS search via an IDSelector, and returns similarity
+    scores alongside the documents for score-based fusion. MMR re-ranks the
+    fetch_k candidates using their stored vectors, without re-embedding.
+    """
+
+    def __init__(
+        self,
+        vectorstore: FAISS,
+        top_k: int = 5,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.75,
+        use_mmr: bool = True
+    ):
+        """Initialize the vector retriever over a FAISS vectorstore."""
+        self.vectorstore = vectorstore
+        self.top_k = top_k
+        self.fetch_k = max(fetch_k, top_k)
+        self.lambda_mult = lambda_mult
+        self.use_mmr = use_mmr
+
+        # Compiled metadata filters: (filter key, index size) -> (eligible count, search params)
+        self._filter_cache = {}
+        model_logger.info(
+            f"Vector retriever initialized with top_k={top_k}, fetch_k={self.fetch_k}, mmr={use_mmr}")
+
+    def _search_params(self, metadata_filter: MetadataFilter) -> Tuple[int, Any]:
+        """FAISS search parameters restricting search to the filter's chunks."""
+        key = (metadata_filter.key, self.vectorstore.index.ntotal)
+        cached = self._filter_cache.get(key)
+        if cached is None:
+            positions = metadata_filter.faiss_positions(self.vectorstore)
+            params = faiss_search_params(positions) if positions.size else None
+            cached = (int(positions.size), params)
+            if len(self._filter_cache) >= 64:
+                self._filter_cache.clear()
+            self._filter_cache[key] = cached
+        return cached
+
+    def _similarity(self, distances: np.ndarray) -> np.ndarray:
+        """Turn FAISS distances into similarities where higher is better."""
+        if self.vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            return distances
+        # Squared L2 distance between unit vectors is 2 - 2 * cosine
+        return np.clip(1.0 - distances / 2.0, 0.0, 1.0)
+
+    def _candidate_vectors(self, positions: np.ndarray) -> np.ndarray:
+        """Fetch the stored vectors for FAISS positions in one call where supported."""
+        index = self.vectorstore.index
+        try:
+            return index.reconstruct_batch(positions)
+        except RuntimeError:
+            # Some index types only support single-vector reconstruction
+            return np.vstack([index.reconstruct(int(position)) for position in positions])
+
+    def _filter_params(self, metadata_filter: Optional[MetadataFilter]) -> Tuple[bool, Any]:
+        """Return (anything eligible, FAISS search params) for a filter."""
+        if metadata_filter is None:
+            return True, None
+        n_eligible, params = self._search_params(metadata_filter)
+        return n_eligible > 0, params
+
+    def search(
+        self, query: str, metadata_filter: Optional[MetadataFilter] = None
+    ) -> Tuple[List[Document], np.ndarray]:
+        """Return the top k source documents (not copies) and their similarity scores."""
+        eligible, params = self._filter_params(metadata_filter)
+        if not eligible:
+            return [], np.empty(0, dtype=np.float32)
+        return self._search_by_embedding(self.vectorstore.embedding_function.embed_query(query), params)
+
+    async def asearch(
+        self, query: str, metadata_filter: Optional[MetadataFilter] = None
+    ) -> Tuple[List[Document], np.ndarray]:
+        """Async search: awaits the query embedding, then searches FAISS in a worker thread."""
+        eligible, params = await asyncio.to_thread(self._filter_params, metadata_filter)
+        if not eligible:
+            return [], np.empty(0, dtype=np.float32)
+        query_embedding = await self.vectorstore.embedding_function.aembed_query(query)
+        return await asyncio.to_thread(self._search_by_embedding, query_embedding, params)
+
+    def _search_by_embedding(
+        self, query_embedding: List[float], params: Any
+    ) -> Tuple[List[Document], np.ndarray]:
+        index = self.vectorstore.index
+        embedding = np.asarray([query_embedding], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(embedding)
+
+        n_fetch = self.fetch_k if self.use_mmr else self.top_k
+        distances, positions = index.search(embedding, n_fetch, params=params)
+        # FAISS pads with -1 when fewer than n_fetch vectors are eligible
+        valid = positions[0] >= 0
+        positions = positions[0][valid]
+        scores = self._similarity(distances[0][valid])
+
+        if self.use_mmr and positions.size > self.top_k:
+            selected = mmr_select(
+                embedding[0], self._candidate_vectors(positions),
+                k=self.top_k, lambda_mult=self.lambda_mult)
+            positions = positions[selected]
+            scores = scores[selected]
+        else:
+            positions = positions[:self.top_k]
+            scores = scores[:self.top_k]
+
+        # Hydrate only the hits, in one lookup where the docstore supports it
+        docstore = self.vectorstore.docstore
+        ids = [self.vectorstore.index_to_docstore_id[position]
+               for position in positions.tolist()]
+        if hasattr(docstore, "mget"):
+            found = docstore.mget(ids)
+        else:
+            found = [docstore.search(docstore_id) for docstore_id in ids]
+        kept = [i for i, doc in enumerate(found) if isinstance(doc, Document)]
+        return [found[i] for i in kept], scores[kept]
+
+    def _to_results(self, query: str, docs: List[Document], scores: np.ndarray) -> List[Document]:
+        results = [
+            Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "vector_score": score}
+            )
+            for doc, score in zip(docs, scores.tolist())
+        ]
+        model_logger.info(
+            f"Vector search retrieved {len(results)} documents for query: {query[:50]}...")
+        return results
+
+    def get_relevant_documents(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """Get documents relevant to the query using vector search."""
+        try:
+            with PerformanceTimer(model_logger, "Vector retrieval"):
+                docs, scores = self.search(query, metadata_filter)
+                return self._to_results(query, docs, scores)
+        except Exception as e:
+            error_msg = f"Error in vector retrieval: {str(e)}"
+            model_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            return []
+
+    async def aget_relevant_documents(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """Async version of get_relevant_documents."""
+        try:
+            with PerformanceTimer(model_logger, "Vector retrieval"):
+                docs, scores = await self.asearch(query, metadata_filter)
+                return self._to_results(query, docs, scores)
+        except Exception as e:
+            error_msg = f"Error in vector retrieval: {str(e)}"
+            model_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            return []
+
+
 class CustomHybridRetriever:
     """Custom hybrid retriever combining vector search and BM25."""
 
@@ -105,9 +381,16 @@ class CustomHybridRetriever:
         weight_vector: float = 0.6,
         weight_keyword: float = 0.4,
         use_rrf: bool = True,
-        rrf_k: int = 60
+        rrf_k: int = 60,
+        fusion_method: Optional[str] = None,
+        metadata_filter: Optional[MetadataFilter] = None
     ):
-        """Initialize the hybrid retriever."""
+        """Initialize the hybrid retriever.
+
+        fusion_method selects one of fusion.FUSION_METHODS; when omitted it
+        follows use_rrf ("rrf" or "weighted"). metadata_filter, if given, is
+        applied inside both retrieval legs.
+        """
         self.vector_retriever = vector_retriever
         self.keyword_retriever = keyword_retriever
         self.top_k = top_k
@@ -115,61 +398,113 @@ class CustomHybridRetriever:
         self.weight_keyword = weight_keyword
         self.use_rrf = use_rrf
         self.rrf_k = rrf_k
+        self.fusion_method = fusion_method or ("rrf" if use_rrf else "weighted")
+        self.metadata_filter = metadata_filter
+        if self.fusion_method not in FUSION_METHODS:
+            raise ValueError(
+                f"Unknown fusion method '{self.fusion_method}', expected one of {FUSION_METHODS}")
         model_logger.info(
-            f"Hybrid retriever initialized with weights: vector={weight_vector}, keyword={weight_keyword}")
-
-    def _reciprocal_rank_fusion(
+            f"Hybrid retriever initialized with {self.fusion_method} fusion, weights: vector={weight_vector}, keyword={weight_keyword}")
+
+    def _vector_candidates(
+        self, query: str, metadata_filter: Optional[MetadataFilter]
+    ) -> Tuple[List[Document], Optional[np.ndarray], List[Dict[str, Any]]]:
+        """Run the vector leg, returning the source documents without copying them."""
+        if isinstance(self.vector_retriever, CustomVectorRetriever):
+            docs, scores = self.vector_retriever.search(query, metadata_filter)
+            return docs, scores, [{"vector_score": score} for score in scores.tolist()]
+        docs = self.vector_retriever.get_relevant_documents(query)
+        if metadata_filter is not None:
+            # Retrievers we don't own can only be filtered after the fact
+            docs = [doc for doc in docs if metadata_filter.matches(doc.metadata)]
+        return docs, None, [{} for _ in docs]
+
+    async def _avector_candidates(
+        self, query: str, metadata_filter: Optional[MetadataFilter]
+    ) -> Tuple[List[Document], Optional[np.ndarray], List[Dict[str, Any]]]:
+        if isinstance(self.vector_retriever, CustomVectorRetriever):
+            docs, scores = await self.vector_retriever.asearch(query, metadata_filter)
+            return docs, scores, [{"vector_score": score} for score in scores.tolist()]
+        return await asyncio.to_thread(self._vector_candidates, query, metadata_filter)
+
+    def _keyword_candidates(
+        self, query: str, metadata_filter: Optional[MetadataFilter]
+    ) -> Tuple[List[Document], Optional[np.ndarray], List[Dict[str, Any]]]:
+        """Run the keyword leg, returning the source documents without copying them."""
+        if isinstance(self.keyword_retriever, CustomBM25Retriever):
+            hits = self.keyword_retriever.search(query, metadata_filter)
+            documents = self.keyword_retriever.documents
+            return (
+                [documents[idx] for idx in hits.indices.tolist()],
+                hits.scores,
+                [{"bm25_score": score} for score in hits.scores.tolist()]
+            )
+        if isinstance(self.keyword_retriever, CustomFTS5Retriever):
+            docs, scores = self.keyword_retriever.search(query, metadata_filter)
+            return docs, scores, [{"bm25_score": score} for score in scores.tolist()]
+        docs = self.keyword_retriever.get_relevant_documents(query)
+        if metadata_filter is not None:
+            docs = [doc for doc in docs if metadata_filter.matches(doc.metadata)]
+        return docs, None, [{} for _ in docs]
+
+    def _fuse_results(
         self,
         vector_docs: List[Document],
-        keyword_docs: List[Document]
+        vector_scores: Optional[np.ndarray],
+        vector_extras: List[Dict[str, Any]],
+        keyword_docs: List[Document],
+        keyword_scores: Optional[np.ndarray],
+        keyword_extras: List[Dict[str, Any]],
+        method: str
     ) -> List[Document]:
-        """Combine results using Reciprocal Rank Fusion."""
-        # Create a dictionary to store document scores by ID
-        doc_scores = {}
-
-        # Process vector search results
-        for rank, doc in enumerate(vector_docs):
-            doc_id = self._get_doc_id(doc)
-            # RRF formula: 1 / (rank + k)
-            score = 1.0 / (rank + self.rrf_k)
-            doc_scores[doc_id] = {
-                "doc": doc,
-                "score": score,
-                "vector_rank": rank,
-                "keyword_rank": None
-            }
-
-        # Process keyword search results
-        for rank, doc in enumerate(keyword_docs):
+        """Fuse both legs on integer chunk IDs and build the final top k."""
+        # Join both legs on chunk ID. Documents indexed before chunk IDs
+        # existed get temporary negative IDs, keyed by their content.
+        sources = {}
+        extras = {}
+        legacy_ids = {}
+
+        def doc_id_of(doc, extra):
             doc_id = self._get_doc_id(doc)
-            score = 1.0 / (rank + self.rrf_k)
-
-            if doc_id in doc_scores:
-                # Document already in results, update score and rank
-                doc_scores[doc_id]["score"] += score
-                doc_scores[doc_id]["keyword_rank"] = rank
-            else:
-                # New document
-                doc_scores[doc_id] = {
-                    "doc": doc,
-                    "score": score,
-                    "vector_rank": None,
-                    "keyword_rank": rank
-                }
-
-        # Sort by score and take top k
-        sorted_docs = sorted(
-            doc_scores.values(), key=lambda x: x["score"], reverse=True)[:self.top_k]
+            if doc_id is None:
+                doc_id = legacy_ids.setdefault(
+                    doc.page_content, -1 - len(legacy_ids))
+            sources.setdefault(doc_id, doc)
+            if extra:
+                extras.setdefault(doc_id, {}).update(extra)
+            return doc_id
+
+        vector_ids = np.fromiter(
+            (doc_id_of(doc, extra) for doc, extra in zip(vector_docs, vector_extras)),
+            dtype=np.int64, count=len(vector_docs))
+        keyword_ids = np.fromiter(
+            (doc_id_of(doc, extra) for doc, extra in zip(keyword_docs, keyword_extras)),
+            dtype=np.int64, count=len(keyword_docs))
+
+        fused = fuse(
+            vector_ids,
+            keyword_ids,
+            vector_scores=vector_scores,
+            keyword_scores=keyword_scores,
+            method=method,
+            top_k=self.top_k,
+            weight_vector=self.weight_vector,
+            weight_keyword=self.weight_keyword,
+            rrf_k=self.rrf_k
+        )
 
         # Create final document list with fusion metadata
+        score_key = "rrf_score" if method == "rrf" else "fusion_score"
         results = []
-        for item in sorted_docs:
-            doc = item["doc"]
-            # Add fusion metadata
-            metadata = {**doc.metadata}
-            metadata["rrf_score"] = item["score"]
-            metadata["vector_rank"] = item["vector_rank"]
-            metadata["keyword_rank"] = item["keyword_rank"]
+        for doc_id, score, vector_rank, keyword_rank in zip(
+                fused.ids.tolist(), fused.scores.tolist(),
+                fused.vector_ranks.tolist(), fused.keyword_ranks.tolist()):
+            doc = sources[doc_id]
+            metadata = {**doc.metadata, **extras.get(doc_id, {})}
+            metadata[score_key] = score
+            metadata["fusion_method"] = method
+            metadata["vector_rank"] = vector_rank if vector_rank >= 0 else None
+            metadata["keyword_rank"] = keyword_rank if keyword_rank >= 0 else None
 
             results.append(Document(
                 page_content=doc.page_content,
@@ -178,115 +513,71 @@ class CustomHybridRetriever:
 
         return results
 
-    def _weighted_fusion(
+    def _get_doc_id(self, doc: Document) -> Optional[int]:
+        """Return the chunk ID assigned at ingest, or None for documents without one."""
+        chunk_id = doc.metadata.get("chunk_id")
+        return int(chunk_id) if chunk_id is not None else None
+
+    def get_relevant_documents(
         self,
-        vector_docs: List[Document],
-        keyword_docs: List[Document]
+        query: str,
+        fusion_method: Optional[str] = None,
+        metadata_filter: Optional[MetadataFilter] = None
     ) -> List[Document]:
-        """Combine results using weighted fusion."""
-        # Create a dictionary to store document scores by ID
-        doc_scores = {}
-
-        # Process vector search results
-        for rank, doc in enumerate(vector_docs):
-            doc_id = self._get_doc_id(doc)
-            # Normalize score based on rank (higher rank = lower score)
-            score = self.weight_vector * \
-                (1.0 - (rank / len(vector_docs)) if vector_docs else 0)
-            doc_scores[doc_id] = {
-                "doc": doc,
-                "score": score,
-                "vector_rank": rank,
-                "keyword_rank": None
-            }
-
-        # Process keyword search results
-        for rank, doc in enumerate(keyword_docs):
-            doc_id = self._get_doc_id(doc)
-            # Normalize score based on rank
-            score = self.weight_keyword * \
-                (1.0 - (rank / len(keyword_docs)) if keyword_docs else 0)
-
-            if doc_id in doc_scores:
-                # Document already in results, update score and rank
-                doc_scores[doc_id]["score"] += score
-                doc_scores[doc_id]["keyword_rank"] = rank
-            else:
-                # New document
-                doc_scores[doc_id] = {
-                    "doc": doc,
-                    "score": score,
-                    "vector_rank": None,
-                    "keyword_rank": rank
-                }
-
-        # Sort by score and take top k
-        sorted_docs = sorted(
-            doc_scores.values(), key=lambda x: x["score"], reverse=True)[:self.top_k]
-
-        # Create final document list with fusion metadata
-        results = []
-        for item in sorted_docs:
-            doc = item["doc"]
-            # Add fusion metadata
-            metadata = {**doc.metadata}
-            metadata["fusion_score"] = item["score"]
-            metadata["vector_rank"] = item["vector_rank"]
-            metadata["keyword_rank"] = item["keyword_rank"]
-
-            results.append(Document(
-                page_content=doc.page_content,
-                metadata=metadata
-            ))
-
-        return results
-
-    def _get_doc_id(self, doc: Document) -> str:
-        """Generate a unique ID for a document based on content and metadata."""
-        # Use file_id and page if available for compatibility with existing system
-        if "file_id" in doc.metadata and "page" in doc.metadata:
-            return f"{doc.metadata['file_id']}_{doc.metadata['page']}"
-
-        # Use source and page if available (from test implementation)
-        if "source" in doc.metadata and "page" in doc.metadata:
-            return f"{doc.metadata['source']}_{doc.metadata['page']}"
-
-        # Fallback to content hash
-        return str(hash(doc.page_content))
-
-    def get_relevant_documents(self, query: str) -> List[Document]:
         """Get documents relevant to the query using hybrid search."""
+        method = fusion_method or self.fusion_method
+        metadata_filter = metadata_filter or self.metadata_filter
         try:
             with PerformanceTimer(model_logger, "Hybrid retrieval"):
                 # Get results from both retrievers
-                vector_docs = self.vector_retriever.get_relevant_documents(
-                    query)
-                keyword_docs = self.keyword_retriever.get_relevant_documents(
-                    query)
-
-                model_logger.info(
-                    f"Vector search returned {len(vector_docs)} documents")
-                model_logger.info(
-                    f"Keyword search returned {len(keyword_docs)} documents")
-
-                # Combine results
-                if self.use_rrf:
-                    results = self._reciprocal_rank_fusion(
-                        vector_docs, keyword_docs)
-                    model_logger.info(
-                        f"RRF fusion returned {len(results)} documents")
-                else:
-                    results = self._weighted_fusion(vector_docs, keyword_docs)
-                    model_logger.info(
-                        f"Weighted fusion returned {len(results)} documents")
+                vector_leg = self._vector_candidates(query, metadata_filter)
+                keyword_leg = self._keyword_candidates(query, metadata_filter)
+                return self._combine(vector_leg, keyword_leg, method)
+        except Exception as e:
+            error_msg = f"Error in hybrid retrieval: {str(e)}"
+            model_logger.error(error_msg)
+            error_logger.error(error_msg, exc_info=True)
+            return []
 
-                return results
+    async def aget_relevant_documents(
+        self,
+        query: str,
+        fusion_method: Optional[str] = None,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> List[Document]:
+        """Async hybrid search; the vector and keyword legs run concurrently."""
+        method = fusion_method or self.fusion_method
+        metadata_filter = metadata_filter or self.metadata_filter
+        try:
+            with PerformanceTimer(model_logger, "Hybrid retrieval"):
+                vector_leg, keyword_leg = await asyncio.gather(
+                    self._avector_candidates(query, metadata_filter),
+                    asyncio.to_thread(self._keyword_candidates,
+                                      query, metadata_filter)
+                )
+                return self._combine(vector_leg, keyword_leg, method)
         except Exception as e:
             error_msg = f"Error in hybrid retrieval: {str(e)}"
             model_logger.error(error_msg)
             error_logger.error(error_msg, exc_info=True)
             return []
 
+    def _combine(self, vector_leg: Tuple, keyword_leg: Tuple, method: str) -> List[Document]:
+        vector_docs, vector_scores, vector_extras = vector_leg
+        keyword_docs, keyword_scores, keyword_extras = keyword_leg
+        model_logger.info(
+            f"Vector search returned {len(vector_docs)} documents")
+        model_logger.info(
+            f"Keyword search returned {len(keyword_docs)} documents")
+
+        # Combine results
+        results = self._fuse_results(
+            vector_docs, vector_scores, vector_extras,
+            keyword_docs, keyword_scores, keyword_extras, method)
+        model_logger.info(
+            f"{method} fusion returned {len(results)} documents")
+        return results
+
 
 class BM25Retriever(BaseRetriever):
     """LangChain compatible BM25 retriever."""
@@ -307,6 +598,49 @@ class BM25Retriever(BaseRetriever):
         return self._custom_retriever.get_relevant_documents(query)
 
 
+class VectorRetriever(BaseRetriever):
+    """LangChain compatible vector retriever over a FAISS vectorstore."""
+
+    k: int = 5  # Define k as a class attribute for Pydantic
+    fetch_k: int = 20
+    lambda_mult: float = 0.75
+
+    def __init__(
+        self,
+        vectorstore: FAISS,
+        k: int = 5,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.75,
+        metadata_filter: Optional[MetadataFilter] = None
+    ):
+        """Initialize the vector retriever with a FAISS vectorstore."""
+        super().__init__()
+        self._custom_retriever = CustomVectorRetriever(
+            vectorstore, top_k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+        self._metadata_filter = metadata_filter
+        self.k = k
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        model_logger.info(
+            f"LangChain VectorRetriever initialized with k={k}, fetch_k={fetch_k}, filter={metadata_filter}")
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """Get documents relevant to the query using vector search."""
+        metadata_filter = _retrieval_options.get().get(
+            "metadata_filter") or self._metadata_filter
+        return self._custom_retriever.get_relevant_documents(query, metadata_filter)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """Get documents relevant to the query without blocking the event loop."""
+        metadata_filter = _retrieval_options.get().get(
+            "metadata_filter") or self._metadata_filter
+        return await self._custom_retriever.aget_relevant_documents(query, metadata_filter)
+
+
 class HybridRetriever(BaseRetriever):
     """LangChain compatible hybrid retriever."""
 
@@ -315,6 +649,7 @@ class HybridRetriever(BaseRetriever):
     weight_keyword: float = 0.4
     use_rrf: bool = True
     rrf_k: int = 60
+    fusion_method: Optional[str] = None
 
     def __init__(
         self,
@@ -324,15 +659,21 @@ class HybridRetriever(BaseRetriever):
         weight_vector: float = 0.6,
         weight_keyword: float = 0.4,
         use_rrf: bool = True,
-        rrf_k: int = 60
+        rrf_k: int = 60,
+        fusion_method: Optional[str] = None,
+        metadata_filter: Optional[MetadataFilter] = None
     ):
         """Initialize the hybrid retriever."""
         super().__init__()
 
+        # If vector_retriever is a VectorRetriever, use its internal retriever
+        if isinstance(vector_retriever, VectorRetriever):
+            vector_retriever = vector_retriever._custom_retriever
+
         # If keyword_retriever is a BM25Retriever, use its internal retriever
         if isinstance(keyword_retriever, BM25Retriever):
             keyword_retriever_internal = keyword_retriever._custom_retriever
-        elif isinstance(keyword_retriever, CustomBM25Retriever):
+        elif isinstance(keyword_retriever, (CustomBM25Retriever, CustomFTS5Retriever)):
             keyword_retriever_internal = keyword_retriever
         else:
             model_logger.warning(
@@ -346,7 +687,9 @@ class HybridRetriever(BaseRetriever):
             weight_vector=weight_vector,
             weight_keyword=weight_keyword,
             use_rrf=use_rrf,
-            rrf_k=rrf_k
+            rrf_k=rrf_k,
+            fusion_method=fusion_method,
+            metadata_filter=metadata_filter
         )
         # Set attributes using the defined class attributes
         self.k = k
@@ -354,14 +697,31 @@ class HybridRetriever(BaseRetriever):
         self.weight_keyword = weight_keyword
         self.use_rrf = use_rrf
         self.rrf_k = rrf_k
+        self.fusion_method = self._custom_retriever.fusion_method
         model_logger.info(
-            f"LangChain HybridRetriever initialized with k={k}, weights: vector={weight_vector}, keyword={weight_keyword}")
+            f"LangChain HybridRetriever initialized with k={k}, {self.fusion_method} fusion, weights: vector={weight_vector}, keyword={weight_keyword}")
 
     def _get_relevant_documents(
         self, query: str, *, run_manager: CallbackManagerForRetrieverRun
     ) -> List[Document]:
         """Get documents relevant to the query using hybrid search."""
-        return self._custom_retriever.get_relevant_documents(query)
+        options = _retrieval_options.get()
+        return self._custom_retriever.get_relevant_documents(
+            query,
+            fusion_method=options.get("fusion_method"),
+            metadata_filter=options.get("metadata_filter")
+        )
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """Get documents relevant to the query, running both legs concurrently."""
+        options = _retrieval_options.get()
+        return await self._custom_retriever.aget_relevant_documents(
+            query,
+            fusion_method=options.get("fusion_method"),
+            metadata_filter=options.get("metadata_filter")
+        )
 
 
 def create_vector_store(documents: List[Document]) -> FAISS:
@@ -369,11 +729,11 @@ def create_vector_store(documents: List[Document]) -> FAISS:
     try:
         with PerformanceTimer(model_logger, "create_vector_store"):
             # Initialize embedding function
-            embedding_function = GoogleGenerativeAIEmbeddings(
+            embedding_function = cached_query_embeddings(GoogleGenerativeAIEmbeddings(
                 model="models/embedding-001",
                 google_api_key=os.getenv("GEMINI_API_KEY"),
                 task_type="retrieval_document"
-            )
+            ))
 
             # Create vector store
             vectorstore = FAISS.from_documents(documents, embedding_function)
@@ -395,13 +755,11 @@ def create_hybrid_retriever(documents: List[Document], top_k: int = 5) -> Custom
             vectorstore = create_vector_store(documents)
 
             # Create vector retriever
-            vector_retriever = vectorstore.as_retriever(
-                search_type="mmr",
-                search_kwargs={
-                    "k": top_k,
-                    "fetch_k": max(top_k * 3, 10),
-                    "lambda_mult": 0.75
-                }
+            vector_retriever = CustomVectorRetriever(
+                vectorstore,
+                top_k=top_k,
+                fetch_k=100,
+                lambda_mult=0.75
             )
 
             # Create keyword retriever
@@ -433,7 +791,11 @@ def create_hybrid_retriever_from_faiss(
     weight_vector: float = 0.6,
     weight_keyword: float = 0.4,
     use_rrf: bool = True,
-    rrf_k: int = 60
+    rrf_k: int = 60,
+    fusion_method: Optional[str] = None,
+    metadata_filter: Optional[MetadataFilter] = None,
+    fetch_k: int = 100,
+    keyword_backend: Optional[str] = None
 ) -> HybridRetriever:
     """
     Create a hybrid retriever from a FAISS vectorstore.
@@ -446,6 +808,12 @@ def create_hybrid_retriever_from_faiss(
         weight_keyword: The weight to give to keyword search results
         use_rrf: Whether to use Reciprocal Rank Fusion (RRF) for combining results
         rrf_k: The k parameter for RRF
+        fusion_method: One of fusion.FUSION_METHODS (overrides use_rrf when given)
+        metadata_filter: Restricts both retrieval legs to matching chunks
+        fetch_k: The number of vector candidates MMR re-ranks
+        keyword_backend: One of KEYWORD_BACKENDS; defaults to KEYWORD_BACKEND
+            ("bm25"). "fts5" searches the FTS5 index in rag_app.db instead of
+            building an in-memory BM25 index, and ignores documents
 
     Returns:
         A HybridRetriever instance
@@ -453,17 +821,30 @@ def create_hybrid_retriever_from_faiss(
     try:
         with PerformanceTimer(model_logger, "create_hybrid_retriever_from_faiss"):
             # Create vector retriever
-            vector_retriever = vectorstore.as_retriever(
-                search_type="mmr",
-                search_kwargs={
-                    "k": k,
-                    "fetch_k": max(k * 3, 10),
-                    "lambda_mult": 0.75
-                }
+            vector_retriever = VectorRetriever(
+                vectorstore,
+                k=k,
+                fetch_k=fetch_k,
+                lambda_mult=0.75,
+                metadata_filter=metadata_filter
             )
 
+            keyword_backend = keyword_backend or os.getenv(
+                "KEYWORD_BACKEND", "bm25")
+            if keyword_backend not in KEYWORD_BACKENDS:
+                raise ValueError(
+                    f"Unknown keyword backend '{keyword_backend}', expected one of {KEYWORD_BACKENDS}")
+            keyword_retriever = None
+            if keyword_backend == "fts5":
+                keyword_index = keyword_index_if_available()
+                if keyword_index is not None:
+                    keyword_retriever = CustomFTS5Retriever(keyword_index, top_k=k)
+                else:
+                    model_logger.warning(
+                        "FTS5 keyword index unavailable, falling back to in-memory BM25")
+
             # Get documents from vectorstore if not provided
-            if documents is None:
+            if keyword_retriever is None and documents is None:
                 try:
                     # Try to get documents from vectorstore using different methods
                     try:
@@ -509,7 +890,8 @@ def create_hybrid_retriever_from_faiss(
                     return WrappedVectorRetriever()
 
             # Create BM25 retriever
-            keyword_retriever = BM25Retriever(documents, k=k)
+            if keyword_retriever is None:
+                keyword_retriever = BM25Retriever(documents, k=k)
 
             # Create hybrid retriever
             hybrid_retriever = HybridRetriever(
@@ -519,7 +901,9 @@ def create_hybrid_retriever_from_faiss(
                 weight_vector=weight_vector,
                 weight_keyword=weight_keyword,
                 use_rrf=use_rrf,
-                rrf_k=rrf_k
+                rrf_k=rrf_k,
+                fusion_method=fusion_method,
+                metadata_filter=metadata_filter
             )
 
             model_logger.info(f"Created hybrid retriever with k={k}")
@@ -0,0 +1,105 @@
+"""
+Disk-backed keyword index over chunk text, using SQLite FTS5.
+
+CustomBM25Retriever keeps the whole corpus in memory and rebuilds its index
+in every process. FTS5KeywordIndex instead searches chunk_fts in rag_app.db,
+an FTS5 index over the chunks table (see chunk_store) that triggers keep up
+to date as chunks are added and deleted, and ranks matches with FTS5's
+built-in bm25(). All workers share it through the database.
+"""
+
+import json
+import re
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+from langchain_core.documents import Document
+from metadata_filter import MetadataFilter
+from logger import error_logger
+
+_TOKEN = re.compile(r"\w+")
+
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching any of its terms.
+
+    Every term is quoted, so punctuation and FTS5 operators in the question
+    are searched for literally instead of being parsed.
+    """
+    terms = list(dict.fromkeys(_TOKEN.findall(query.lower())))
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class FTS5KeywordIndex:
+    """Searches chunk text through the chunk_fts FTS5 table."""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        """
+        Args:
+            connect: Returns a connection to the database holding chunk_fts
+        """
+        self.connect = connect
+
+    def available(self) -> bool:
+        """Whether the chunk_fts table exists (SQLite may lack FTS5)."""
+        conn = self.connect()
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'chunk_fts'").fetchone()
+        finally:
+            conn.close()
+        return row is not None
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Return the top k chunks matching any query term, best first.
+
+        Scores are negated bm25() values, so higher is better as with the
+        in-memory BM25 engine.
+        """
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        condition, params = (metadata_filter.sql_condition()
+                             if metadata_filter is not None else ("1", []))
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                f"""SELECT rowid, text, metadata, -bm25(chunk_fts) AS score FROM chunk_fts
+                    WHERE chunk_fts MATCH ? AND {condition}
+                    ORDER BY bm25(chunk_fts) LIMIT ?""",
+                [expression, *params, top_k]).fetchall()
+        finally:
+            conn.close()
+        return [(Document(id=str(row[0]), page_content=row[1], metadata=json.loads(row[2])), row[3])
+                for row in rows]
+
+
+_keyword_index: Optional[FTS5KeywordIndex] = None
+
+
+def get_keyword_index() -> FTS5KeywordIndex:
+    """The keyword index in rag_app.db, on the pooled db_utils connections."""
+    global _keyword_index
+    if _keyword_index is None:
+        from db_utils import get_db_connection
+        _keyword_index = FTS5KeywordIndex(get_db_connection)
+    return _keyword_index
+
+
+def keyword_index_if_available() -> Optional[FTS5KeywordIndex]:
+    """The keyword index, or None if this SQLite build has no FTS5."""
+    try:
+        index = get_keyword_index()
+        return index if index.available() else None
+    except sqlite3.Error as e:
+        error_logger.error(
+            f"Could not open the FTS5 keyword index: {str(e)}", exc_info=True)
+        return None
@@ -1,24 +1,67 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain_core.runnables import RunnableLambda
+from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from faiss_utils import vectorstore
-from hybrid_search import create_hybrid_retriever_from_faiss, create_hybrid_retriever
+from faiss_utils import get_vectorstore, get_index_generation
+from hybrid_search import create_hybrid_retriever_from_faiss, create_hybrid_retriever, VectorRetriever
+from query_routing import create_routed_history_aware_retriever
+from context_packer import pack_context
 from dotenv import load_dotenv
 from logger import model_logger, error_logger, PerformanceTimer
 import os
 import time
+import threading
 
 load_dotenv()
 
 model_logger.info("Initializing LangChain utilities")
 
+# Built chains are reused across requests. They are keyed by
+# (model, use_hybrid_search, index generation), so they are rebuilt only when
+# the index changes. LLM clients are independent of the index and are kept
+# for the life of the process so their HTTP connections stay warm.
+_registry_lock = threading.Lock()
+_chain_registry = {}
+_llm_clients = {}
+
+
+def _normalize_model(model):
+    # Initialize LLM - ONLY USE GEMINI MODELS
+    # Force model to be a Gemini model
+    if not model.startswith("gemini"):
+        model_logger.warning(
+            f"Non-Gemini model requested: {model}, forcing to gemini-2.0-flash")
+        return "gemini-2.0-flash"
+    return model
+
+
+def get_llm(model="gemini-2.0-flash"):
+    """Return the shared chat client for a Gemini model, creating it on first use."""
+    model = _normalize_model(model)
+    with _registry_lock:
+        llm = _llm_clients.get(model)
+        if llm is None:
+            model_logger.info(f"Creating Gemini client for model: {model}")
+            llm = ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=os.getenv("GEMINI_API_KEY"),
+                temperature=0.7,
+                top_k=40,
+                max_output_tokens=2048
+            )
+            _llm_clients[model] = llm
+        return llm
 
-def get_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
+
+def build_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
     """
     Create a RAG chain with the specified model.
 
+    Per-request retrieval settings (fusion method, metadata filter) are not
+    part of the chain; apply them with hybrid_search.retrieval_options().
+
     Args:
         model (str): The model to use for the RAG chain.
         use_hybrid_search (bool): Whether to use hybrid search (vector + BM25) or just vector search.
@@ -26,10 +69,11 @@ def get_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
     Returns:
         A LangChain retrieval chain.
     """
-    with PerformanceTimer(model_logger, f"get_rag_chain:{model}"):
+    with PerformanceTimer(model_logger, f"build_rag_chain:{model}"):
         try:
             # Configure retriever
             model_logger.info(f"Configuring retriever for model: {model}")
+            vectorstore = get_vectorstore()
 
             if use_hybrid_search:
                 # Use hybrid search (vector + BM25)
@@ -40,38 +84,24 @@ def get_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
                     weight_vector=0.6,
                     weight_keyword=0.4,
                     use_rrf=True,
-                    rrf_k=60
+                    rrf_k=60,
+                    fetch_k=100
                 )
                 model_logger.info("Hybrid retriever configured")
             else:
                 # Use vector search only
                 model_logger.info("Using vector search only")
-                retriever = vectorstore.as_retriever(
-                    search_type="mmr",
-                    search_kwargs={
-                        "k": 6,
-                        "fetch_k": 20,
-                        "lambda_mult": 0.75
-                    }
+                retriever = VectorRetriever(
+                    vectorstore,
+                    k=6,
+                    fetch_k=100,
+                    lambda_mult=0.75
                 )
                 model_logger.info(
-                    "Vector retriever configured with MMR search")
-
-            # Initialize LLM - ONLY USE GEMINI MODELS
-            # Force model to be a Gemini model
-            if not model.startswith("gemini"):
-                model_logger.warning(
-                    f"Non-Gemini model requested: {model}, forcing to gemini-2.0-flash")
-                model = "gemini-2.0-flash"
+                    "Vector retriever configured with vectorized MMR search")
 
             model_logger.info(f"Using Gemini model: {model}")
-            llm = ChatGoogleGenerativeAI(
-                model=model,
-                google_api_key=os.getenv("GEMINI_API_KEY"),
-                temperature=0.7,
-                top_k=40,
-                max_output_tokens=2048
-            )
+            llm = get_llm(model)
 
             # Contextualization prompt
             model_logger.info("Creating contextualization prompt")
@@ -81,13 +111,25 @@ def get_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
                 ("human", "{input}")
             ])
 
-            model_logger.info("Creating history-aware retriever")
-            history_aware_retriever = create_history_aware_retriever(
+            # Only questions that depend on the history go through the LLM rewrite;
+            # in speculative mode retrieval for the raw question runs alongside it.
+            # Off by default: most rewrites resolve a reference the raw question
+            # lacks, so the speculative retrieval is usually thrown away
+            speculative = os.getenv(
+                "SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+            model_logger.info(
+                f"Creating history-aware retriever (speculative={speculative})")
+            history_aware_retriever = create_routed_history_aware_retriever(
                 llm,
                 retriever,
-                contextualize_prompt
+                contextualize_prompt,
+                speculative=speculative
             )
 
+            # Merge, dedupe and budget the retrieved chunks before they are stuffed
+            context_retriever = history_aware_retriever | RunnableLambda(
+                pack_context, name="pack_context")
+
             # QA prompt - simplified for basic RAG
             model_logger.info("Creating QA prompt")
             qa_prompt = ChatPromptTemplate.from_messages([
@@ -106,7 +148,7 @@ def get_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
 
             model_logger.info("Creating retrieval chain")
             retrieval_chain = create_retrieval_chain(
-                history_aware_retriever, question_answer_chain
+                context_retriever, question_answer_chain
             )
 
             model_logger.info(
@@ -118,3 +160,41 @@ def get_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
             model_logger.error(error_msg)
             error_logger.error(error_msg, exc_info=True)
             raise
+
+
+def get_rag_chain(model="gemini-2.0-flash", use_hybrid_search=True):
+    """
+    Return a RAG chain for the model, reusing one built for the current index.
+
+    Args:
+        model (str): The model to use for the RAG chain.
+        use_hybrid_search (bool): Whether to use hybrid search (vector + BM25) or just vector search.
+
+    Returns:
+        A LangChain retrieval chain.
+    """
+    model = _normalize_model(model)
+    generation = get_index_generation()
+    key = (model, bool(use_hybrid_search), generation)
+
+    chain = _chain_registry.get(key)
+    if chain is not None:
+        return chain
+
+    with _registry_lock:
+        # Drop chains built on an older index
+        stale = [k for k in _chain_registry if k[2] != generation]
+        for stale_key in stale:
+            del _chain_registry[stale_key]
+        if stale:
+            model_logger.info(
+                f"Evicted {len(stale)} RAG chains built before index generation {generation}")
+
+    # Build outside the lock; a concurrent duplicate build is harmless
+    chain = build_rag_chain(model=model, use_hybrid_search=use_hybrid_search)
+    with _registry_lock:
+        if get_index_generation() == generation:
+            chain = _chain_registry.setdefault(key, chain)
+    model_logger.info(
+        f"RAG chain registered for model={model}, hybrid={use_hybrid_search}, generation={generation}")
+    return chain
@@ -0,0 +1,329 @@
+"""
+Retention and compaction for application_logs.
+
+Chat logs are otherwise kept forever. LogRetentionJob applies age-based
+policies on a background thread:
+- compact:DAYS deletes turns older than DAYS that are already folded into
+  their session's summary; the summary keeps their content for the prompts.
+- archive:DAYS exports sessions idle for DAYS to gzipped JSONL files in the
+  archive directory (LOG_ARCHIVE_DIR), one per batch, then deletes them.
+- delete:DAYS deletes sessions idle for DAYS.
+
+Rows are deleted in small transactions with a pause between them, so the
+job never holds the write lock for long. Afterwards, pages freed by the
+deletes are returned to the OS with incremental VACUUM.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from db_utils import get_db_connection
+from logger import db_logger, error_logger, PerformanceTimer
+
+RETENTION_ACTIONS = ("compact", "archive", "delete")
+
+LOG_COLUMNS = ("id", "session_id", "user_query", "gpt_response", "model",
+               "processing_time", "created_at")
+
+# An archive file is written under this suffix and only renamed once the
+# delete of its rows has committed
+PENDING_SUFFIX = ".pending"
+
+
+def parse_policies(spec: Optional[str]) -> List[Tuple[str, float]]:
+    """
+    Parse policies written as "action:days" pairs, e.g. "compact:30,archive:180".
+
+    Raises:
+        ValueError: If an action or age is invalid
+    """
+    policies = []
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        action, _, days = item.strip().partition(":")
+        if action not in RETENTION_ACTIONS:
+            raise ValueError(
+                f"Unknown retention action '{action}', expected one of {RETENTION_ACTIONS}")
+        if float(days) <= 0:
+            raise ValueError(f"Retention age must be positive: '{item}'")
+        policies.append((action, float(days)))
+    return policies
+
+
+def _age_modifier(days: float) -> str:
+    """SQLite datetime() modifier for an age, e.g. '-30.0 days'."""
+    return f"-{days} days"
+
+
+class LogRetentionJob:
+    """Applies retention policies to application_logs, periodically or on demand."""
+
+    def __init__(
+        self,
+        policies: List[Tuple[str, float]],
+        batch_size: int = 500,
+        interval: float = 24 * 3600,
+        archive_dir: Optional[str] = None,
+        pause: float = 0.05,
+        vacuum_pages: int = 1000
+    ):
+        """
+        Args:
+            policies: (action, age in days) pairs, see parse_policies
+            batch_size: Most rows deleted per transaction
+            interval: Seconds between runs of the background thread
+            archive_dir: Where archive policies write gzipped JSONL
+            pause: Seconds to sleep between batches, letting other writers in
+            vacuum_pages: Most pages freed per incremental VACUUM step
+
+        Raises:
+            ValueError: If there is an archive policy but no archive_dir
+        """
+        if archive_dir is None and any(action == "archive" for action, _ in policies):
+            raise ValueError(
+                "Archive retention policies need an archive directory (LOG_ARCHIVE_DIR); "
+                "use a delete policy to expire logs without keeping them")
+        self.policies = policies
+        self.batch_size = batch_size
+        self.interval = interval
+        self.archive_dir = archive_dir
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self._thread = None
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()
+        self.totals = Counter()
+        self.last_run = None
+
+    def run_once(self) -> Dict[str, int]:
+        """Apply every policy once; returns the rows affected and pages freed."""
+        with self._run_lock, PerformanceTimer(db_logger, "log_retention"):
+            counts = Counter()
+            if self.archive_dir is not None and os.path.isdir(self.archive_dir):
+                self._settle_pending_archives()
+            for action, days in self.policies:
+                if action == "compact":
+                    counts["compacted"] += self._compact(days)
+                else:
+                    archive = action == "archive"
+                    rows, sessions = self._expire_sessions(days, archive)
+                    counts["archived" if archive else "deleted"] += rows
+                    counts["sessions_expired"] += sessions
+            counts["pages_freed"] += self._incremental_vacuum()
+
+            self.totals.update(counts)
+            self.last_run = datetime.now(timezone.utc).isoformat()
+            db_logger.info(f"Log retention finished: {dict(counts)}")
+            return dict(counts)
+
+    def _compact(self, days: float) -> int:
+        """Delete summarized turns older than days, a batch at a time."""
+        removed = 0
+        while not self._stop.is_set():
+            conn = get_db_connection()
+            try:
+                cursor = conn.execute(
+                    '''DELETE FROM application_logs WHERE id IN
+                       (SELECT l.id FROM application_logs l
+                        JOIN session_summaries s ON s.session_id = l.session_id
+                        WHERE l.id <= s.summarized_through
+                          AND l.created_at < datetime('now', ?)
+                        LIMIT ?)''',
+                    (_age_modifier(days), self.batch_size))
+                conn.commit()
+            finally:
+                conn.close()
+            removed += cursor.rowcount
+            if cursor.rowcount < self.batch_size:
+                break
+            time.sleep(self.pause)
+        return removed
+
+    def _expire_sessions(self, days: float, archive: bool) -> Tuple[int, int]:
+        """Delete (and optionally archive) sessions idle for days; returns (rows, sessions)."""
+        conn = get_db_connection()
+        try:
+            session_ids = [row[0] for row in conn.execute(
+                '''SELECT session_id FROM application_logs GROUP BY session_id
+                   HAVING max(created_at) < datetime('now', ?)''',
+                (_age_modifier(days),)).fetchall()]
+        finally:
+            conn.close()
+
+        removed = 0
+        expired = 0
+        for session_id in session_ids:
+            if self._stop.is_set():
+                break
+            rows = self._expire_session(session_id, days, archive)
+            removed += rows
+            expired += 1 if rows else 0
+        return removed, expired
+
+    def _expire_session(self, session_id: str, days: float, archive: bool) -> int:
+        removed = 0
+        while not self._stop.is_set():
+            pending = None
+            conn = get_db_connection()
+            try:
+                # Taking the write lock first serializes workers running the
+                # job at once, so no batch is archived twice
+                conn.execute("BEGIN IMMEDIATE")
+                # Re-checked per batch: the session may have been resumed
+                rows = conn.execute(
+                    f'''SELECT {", ".join(LOG_COLUMNS)} FROM application_logs
+                        WHERE session_id = ?
+                          AND (SELECT max(created_at) FROM application_logs WHERE session_id = ?)
+                              < datetime('now', ?)
+                        ORDER BY id LIMIT ?''',
+                    (session_id, session_id, _age_modifier(days), self.batch_size)).fetchall()
+                if not rows:
+                    conn.execute(
+                        '''DELETE FROM session_summaries WHERE session_id = ?
+                           AND NOT EXISTS (SELECT 1 FROM application_logs WHERE session_id = ?)''',
+                        (session_id, session_id))
+                    conn.commit()
+                    return removed
+                if archive:
+                    pending = self._write_pending_archive(rows)
+                conn.executemany(
+                    "DELETE FROM application_logs WHERE id = ?", [(row[0],) for row in rows])
+                conn.commit()
+            finally:
+                conn.close()
+            if pending is not None:
+                self._promote_archive(pending)
+            removed += len(rows)
+            time.sleep(self.pause)
+        return removed
+
+    def _write_pending_archive(self, rows) -> str:
+        """Write a batch to a pending gzipped JSONL archive; returns its path."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(
+            self.archive_dir,
+            f"application_logs-{datetime.now(timezone.utc):%Y-%m-%d}-{rows[0][0]:012d}.jsonl.gz"
+            + PENDING_SUFFIX)
+        with gzip.open(path, "wt", encoding="utf-8") as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(zip(LOG_COLUMNS, row))) + "\n")
+        return path
+
+    @staticmethod
+    def _promote_archive(pending: str) -> None:
+        try:
+            os.replace(pending, pending[:-len(PENDING_SUFFIX)])
+        except FileNotFoundError:
+            # Another worker's _settle_pending_archives got there first
+            pass
+
+    def _settle_pending_archives(self) -> None:
+        """
+        Resolve archives left pending by a run that stopped between writing a
+        batch and renaming it: kept if the delete committed (none of its rows
+        remain), dropped otherwise, since those rows will be archived again.
+        """
+        for name in os.listdir(self.archive_dir):
+            if not name.endswith(PENDING_SUFFIX):
+                continue
+            path = os.path.join(self.archive_dir, name)
+            conn = get_db_connection()
+            try:
+                # Under the write lock no batch is between its write and commit
+                conn.execute("BEGIN IMMEDIATE")
+                if not os.path.exists(path):
+                    conn.commit()
+                    continue
+                try:
+                    with gzip.open(path, "rt", encoding="utf-8") as archive:
+                        ids = [json.loads(line)["id"] for line in archive]
+                except (OSError, EOFError, ValueError):
+                    # Cut off while writing, so its delete never ran
+                    ids = None
+                committed = ids is not None and conn.execute(
+                    "SELECT count(*) FROM application_logs WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(ids),)).fetchone()[0] == 0
+                if committed:
+                    self._promote_archive(path)
+                else:
+                    os.remove(path)
+                conn.commit()
+            finally:
+                conn.close()
+            db_logger.info(
+                f"Settled pending log archive {name}: {'kept' if committed else 'dropped'}")
+
+    def _incremental_vacuum(self) -> int:
+        """Return free pages to the OS, vacuum_pages at a time; returns pages freed."""
+        conn = get_db_connection()
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                db_logger.warning(
+                    "rag_app.db is not in incremental auto_vacuum mode; run VACUUM once "
+                    "to switch it, until then freed pages are only reused")
+                return 0
+            freed = 0
+            while not self._stop.is_set():
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if before == 0:
+                    break
+                conn.execute(
+                    f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})").fetchall()
+                after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                freed += before - after
+                if after >= before:
+                    break
+                time.sleep(self.pause)
+            return freed
+        finally:
+            conn.close()
+
+    def start(self) -> None:
+        """Run the job every interval on a background thread, if any policy is set."""
+        if not self.policies:
+            db_logger.info("Log retention disabled (no LOG_RETENTION_POLICIES)")
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="log-retention", daemon=True)
+            self._thread.start()
+            db_logger.info(
+                f"Log retention started: {self.policies}, every {self.interval}s")
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Stop the background thread, interrupting a run between batches."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                error_logger.error(
+                    f"Log retention run failed: {str(e)}", exc_info=True)
+            self._stop.wait(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policies": [f"{action}:{days:g}" for action, days in self.policies],
+            "archive_dir": self.archive_dir,
+            "last_run": self.last_run,
+            "totals": dict(self.totals)
+        }
+
+
+log_retention = LogRetentionJob(
+    parse_policies(os.getenv("LOG_RETENTION_POLICIES")),
+    batch_size=int(os.getenv("LOG_RETENTION_BATCH_SIZE", "500")),
+    interval=float(os.getenv("LOG_RETENTION_INTERVAL_HOURS", "24")) * 3600,
+    archive_dir=os.getenv("LOG_ARCHIVE_DIR") or None
+)
@@ -0,0 +1,165 @@
+"""
+Background batched writer for chat logs.
+
+/chat hands its log row to the writer and returns without waiting for the
+commit. A single writer thread drains a bounded queue and inserts rows in
+one transaction per batch: whenever batch_size rows are waiting or
+flush_interval has passed since the first row of the batch. When the
+queue is full, new rows are dropped and counted rather than stalling
+requests.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+from db_utils import insert_application_logs_batch
+from logger import db_logger, error_logger
+
+_STOP = object()
+
+
+class BatchedLogWriter:
+    """Bounded queue of chat logs, written in batches by one thread."""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 0.05):
+        """
+        Args:
+            max_queue: Rows held before new ones are dropped
+            batch_size: Most rows written per transaction
+            flush_interval: Seconds a row may wait for its batch to fill
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Rows per session not yet committed, for read-your-writes
+        self._pending = Counter()
+        self._pending_changed = threading.Condition()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+                db_logger.info(
+                    f"Log writer started (batch_size={self.batch_size}, flush_interval={self.flush_interval}s)")
+
+    def submit(self, session_id: str, question: str, answer: str, model: str,
+               processing_time: float = 0.0) -> bool:
+        """Queue a chat log; returns False if it was dropped because the queue is full."""
+        self.start()
+        with self._pending_changed:
+            self._pending[session_id] += 1
+        try:
+            self._queue.put_nowait(
+                (session_id, question, answer, model, processing_time))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            self._settle([session_id])
+            error_logger.error(
+                f"Log writer queue full, dropped log for session {session_id} ({self.dropped} dropped so far)")
+            return False
+
+    def wait_until_written(self, session_id: str, timeout: Optional[float] = 1.0) -> bool:
+        """Block until the session's queued logs are committed (or dropped)."""
+        with self._pending_changed:
+            return self._pending_changed.wait_for(
+                lambda: self._pending[session_id] <= 0, timeout=timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is written."""
+        with self._pending_changed:
+            return self._pending_changed.wait_for(
+                lambda: not +self._pending, timeout=timeout)
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Write everything still queued, then stop the writer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        db_logger.info(
+            f"Log writer stopped: {self.written} written, {self.dropped} dropped, {self.failed} failed")
+
+    def _settle(self, session_ids) -> None:
+        with self._pending_changed:
+            self._pending.subtract(session_ids)
+            self._pending = +self._pending
+            self._pending_changed.notify_all()
+
+    def _write(self, batch) -> None:
+        try:
+            insert_application_logs_batch(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            error_logger.error(
+                f"Log writer failed to write {len(batch)} logs: {str(e)}", exc_info=True)
+        finally:
+            self._settle([row[0] for row in batch])
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # After the deadline, still take whatever is already queued
+                    item = self._queue.get(timeout=remaining) if remaining > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+        # Drain anything queued before the stop
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+
+log_writer = BatchedLogWriter(
+    max_queue=int(os.getenv("LOG_WRITER_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("LOG_WRITER_BATCH_SIZE", "100")),
+    flush_interval=int(os.getenv("LOG_WRITER_FLUSH_MS", "50")) / 1000
+)
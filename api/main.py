@@ -1,26 +1,63 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, status, Depends, Header, Response, Cookie
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, status, Depends, Header, Response, Cookie, BackgroundTasks, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from typing import List, Optional, Dict, Any
 from pydantic_models import QueryInput, QueryResponse, DocumentInfo, DeleteFileRequest, UserCreate, UserLogin, UserResponse, LoginResponse, UserDelete, UserModify, UserRole
-from faiss_utils import index_document_to_faiss, delete_doc_from_faiss, clean_faiss_db_except_current
-from langchain_utils import get_rag_chain
-from db_utils import get_chat_history, insert_application_logs, insert_document_record, delete_document_record, get_all_documents, authenticate_user, create_user, get_user_by_id, delete_user, modify_username, get_all_users
+from faiss_utils import index_document_to_faiss, delete_doc_from_faiss, clean_faiss_db_except_current, get_vectorstore, get_index_generation, get_query_embedding_stats
+from langchain_utils import get_rag_chain, get_llm
+from history_manager import history_manager_from_env, summarize_with_llm
+from metadata_filter import MetadataFilter
+from hybrid_search import retrieval_options
+from answer_cache import answer_cache, normalize_question
+from single_flight import SingleFlight
+from log_writer import log_writer
+from log_retention import log_retention
+from db_utils import close_db_connections, insert_document_record, delete_document_record, get_all_documents, get_documents_page, get_users_page, authenticate_user, create_user, get_user_by_id, delete_user, modify_username, get_user_cache_stats, get_all_users
 from logger import api_logger, error_logger, PerformanceTimer
 import uuid
+import json
+import hashlib
 import shutil
 import os
 import traceback
 import time
 import sqlite3
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
+# Prompts get the last few turns verbatim plus a rolling summary of older ones
+history_manager = history_manager_from_env(
+    lambda summary, turns: summarize_with_llm(get_llm(), summary, turns))
+
+# Identical chat queries in flight at the same time share one chain run
+chat_flights = SingleFlight()
+
+# Page sizes for the keyset-paginated listing endpoints
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
 # Create a directory for storing uploaded files
 UPLOAD_DIR = "./uploaded_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_writer.start()
+    log_retention.start()
+    yield
+    api_logger.info("Shutting down")
+    log_retention.stop()
+    # Write queued chat logs before the connections go away
+    log_writer.stop()
+    close_db_connections()
+
+
 app = FastAPI(title="Basic RAG Chatbot",
               description="A simple Retrieval Augmented Generation chatbot system",
+              lifespan=lifespan,
               version="1.0.0")
 
 # Add CORS middleware
@@ -31,6 +68,7 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization",
                    "Accept", "X-Requested-With", "Origin"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Global exception handler
@@ -103,11 +141,27 @@ async def logout():
 
 
 @app.get("/admin/list-users")
-async def list_users():
-    """Get a list of all users in the system."""
+async def list_users(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """
+    Get the users in the system, all at once or a page at a time.
+
+    Without `limit` or `after` every user is returned. Otherwise a page of
+    `limit` (default PAGE_SIZE) users is returned; pass the X-Next-Cursor
+    response header back as `after` to get the next page.
+    """
     try:
-        users = get_all_users()
+        if limit is None and after is None:
+            return get_all_users()
+        users, next_cursor = get_users_page(limit or PAGE_SIZE, after)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return users
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         error_id = str(uuid.uuid4())
         error_msg = f"Error listing users: {str(e)}"
@@ -119,6 +173,41 @@ async def list_users():
         )
 
 
+@app.get("/admin/cache-stats")
+async def cache_stats():
+    """Get hit-rate metrics for the query embedding, answer and user caches."""
+    return {
+        "query_embeddings": get_query_embedding_stats(),
+        "answers": answer_cache.stats(),
+        "chat_flights": chat_flights.stats(),
+        "users": get_user_cache_stats()
+    }
+
+
+@app.get("/admin/log-writer-stats")
+async def log_writer_stats():
+    """Get queue depth and write/drop counters for the chat log writer."""
+    return log_writer.stats()
+
+
+@app.get("/admin/log-retention")
+async def log_retention_stats():
+    """Get the chat log retention policies and what they have removed so far."""
+    return log_retention.stats()
+
+
+@app.post("/admin/log-retention/run")
+async def run_log_retention():
+    """Apply the chat log retention policies now."""
+    try:
+        return await run_in_threadpool(log_retention.run_once)
+    except Exception as e:
+        error_msg = f"Log retention run failed: {str(e)}"
+        api_logger.error(error_msg)
+        error_logger.error(error_msg, exc_info=True)
+        raise HTTPException(status_code=500, detail=error_msg)
+
+
 @app.post("/admin/create-user")
 async def create_new_user(user_data: UserCreate):
     user_id, error = create_user(
@@ -308,8 +397,73 @@ def cleanup_uploaded_files(current_file_id: int):
             f"Error cleaning up uploaded files: {str(e)}", exc_info=True)
 
 
+def load_formatted_history(session_id: Optional[str]) -> List[tuple]:
+    """Load a session's windowed chat history in the (role, message) format LangChain expects."""
+    if not session_id:
+        return []
+    api_logger.info(f"Getting chat history for session: {session_id}")
+    # The previous turn may still be queued in the log writer
+    log_writer.wait_until_written(session_id)
+    formatted_history = history_manager.load(session_id)
+    api_logger.info(
+        f"Retrieved {len(formatted_history)} chat history messages")
+    return formatted_history
+
+
+def update_session_summary(session_id: str) -> None:
+    """Fold old turns into the session summary once the latest turn is written."""
+    log_writer.wait_until_written(session_id)
+    history_manager.update(session_id)
+
+
+def query_metadata_filter(query: QueryInput) -> Optional[MetadataFilter]:
+    """Compile the request's retrieval filter, if any."""
+    if not query.filter:
+        return None
+    return MetadataFilter.from_dict(query.filter.model_dump(mode="json"))
+
+
+def answer_cache_scope(query: QueryInput, formatted_history: List[tuple],
+                       metadata_filter: Optional[MetadataFilter]) -> Optional[tuple]:
+    """
+    Cache scope for a query's answer, or None if the answer must not be cached.
+
+    Only answers generated without any chat history (or session summary) are
+    cached: the history shapes the answer even when the question looks
+    standalone, and the scope is shared across sessions.
+    """
+    if formatted_history:
+        return None
+    return (
+        query.model,
+        bool(query.use_hybrid_search),
+        query.fusion_method.value,
+        metadata_filter.key if metadata_filter else None
+    )
+
+
+def chat_flight_key(query: QueryInput, formatted_history: List[tuple],
+                    metadata_filter: Optional[MetadataFilter], generation: int) -> tuple:
+    """Key under which concurrent identical chat queries are coalesced."""
+    history_hash = hashlib.sha1(
+        json.dumps(formatted_history).encode("utf-8")).hexdigest()
+    return (
+        query.model,
+        bool(query.use_hybrid_search),
+        query.fusion_method.value,
+        metadata_filter.key if metadata_filter else None,
+        normalize_question(query.question),
+        history_hash,
+        generation
+    )
+
+
+def embed_query(text: str) -> List[float]:
+    return get_vectorstore().embedding_function.embed_query(text)
+
+
 @app.post("/chat")
-async def chat_endpoint(query: QueryInput) -> QueryResponse:
+async def chat_endpoint(query: QueryInput, background_tasks: BackgroundTasks) -> QueryResponse:
     """
     Process a chat query using RAG.
 
@@ -323,54 +477,79 @@ async def chat_endpoint(query: QueryInput) -> QueryResponse:
         with PerformanceTimer(api_logger, f"chat_endpoint:{query.question[:30]}"):
             api_logger.info(f"Received chat query: {query.question[:100]}...")
 
-            # Get chat history from database if session_id is provided
-            chat_history = []
-            if query.session_id:
-                api_logger.info(
-                    f"Getting chat history for session: {query.session_id}")
-                chat_history = get_chat_history(query.session_id)
-                api_logger.info(
-                    f"Retrieved {len(chat_history)} chat history items")
-
-            # Convert chat history to the format expected by LangChain
-            formatted_history = []
-            for item in chat_history:
-                formatted_history.append(("human", item["question"]))
-                formatted_history.append(("ai", item["answer"]))
+            # SQLite and the embedding client are blocking; keep them off the event loop
+            formatted_history = await run_in_threadpool(
+                load_formatted_history, query.session_id)
 
             # Get RAG chain with specified model and hybrid search option
             use_hybrid_search = query.use_hybrid_search if hasattr(
                 query, 'use_hybrid_search') else True
-            chain = get_rag_chain(
-                model=query.model, use_hybrid_search=use_hybrid_search)
+            metadata_filter = query_metadata_filter(query)
 
-            # Process query
-            api_logger.info(f"Processing query with model: {query.model}")
+            # Questions asked without history may already have a cached answer
             start_time = time.time()
-            response = chain.invoke({
-                "input": query.question,
-                "chat_history": formatted_history
-            })
+            generation = get_index_generation()
+            cache_scope = answer_cache_scope(
+                query, formatted_history, metadata_filter)
+            cached, question_embedding = None, None
+            if cache_scope is not None:
+                cached, question_embedding = await run_in_threadpool(
+                    answer_cache.lookup, generation, cache_scope,
+                    query.question, embed_query)
+
+            if cached is not None:
+                answer = cached.answer
+                api_logger.info(f"Answer served from cache: {answer[:100]}...")
+            else:
+                # Process query
+                api_logger.info(f"Processing query with model: {query.model}")
+                chain = await run_in_threadpool(
+                    get_rag_chain, model=query.model,
+                    use_hybrid_search=use_hybrid_search)
+
+                async def run_chain():
+                    with retrieval_options(fusion_method=query.fusion_method.value,
+                                           metadata_filter=metadata_filter):
+                        return await chain.ainvoke({
+                            "input": query.question,
+                            "chat_history": formatted_history
+                        })
+
+                response = await chat_flights.run(
+                    chat_flight_key(query, formatted_history,
+                                    metadata_filter, generation),
+                    run_chain)
+
+                # Extract answer
+                answer = response["answer"]
+                api_logger.info(f"Generated answer: {answer[:100]}...")
+
+                if cache_scope is not None:
+                    await run_in_threadpool(
+                        answer_cache.store,
+                        generation, cache_scope, query.question, answer,
+                        describe_sources(response["context"]), embed_query,
+                        embedding=question_embedding)
+
             end_time = time.time()
             processing_time = end_time - start_time
             api_logger.info(
                 f"Query processed in {processing_time:.2f} seconds")
 
-            # Extract answer
-            answer = response["answer"]
-            api_logger.info(f"Generated answer: {answer[:100]}...")
-
             # Log to database if session_id is provided
             if query.session_id:
                 api_logger.info(
                     f"Logging chat to database for session: {query.session_id}")
-                insert_application_logs(
+                log_writer.submit(
                     session_id=query.session_id,
                     question=query.question,
                     answer=answer,
                     model=query.model,
                     processing_time=processing_time
                 )
+                # Fold turns leaving the history window into the summary
+                background_tasks.add_task(
+                    update_session_summary, query.session_id)
 
             # Return response
             return QueryResponse(
@@ -389,13 +568,149 @@ async def chat_endpoint(query: QueryInput) -> QueryResponse:
         )
 
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def describe_sources(docs) -> List[Dict[str, Any]]:
+    """Metadata about retrieved chunks that is safe to send to the client."""
+    fields = ("chunk_id", "file_id", "page", "type", "rrf_score",
+              "fusion_score", "vector_score", "bm25_score")
+    return [
+        {field: doc.metadata[field]
+            for field in fields if doc.metadata.get(field) is not None}
+        for doc in docs
+    ]
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(query: QueryInput):
+    """
+    Process a chat query using RAG and stream the answer as Server-Sent Events.
+
+    Events, in order:
+        metadata: the retrieved sources, sent as soon as retrieval finishes
+        token: an answer delta
+        done: the final processing_time and model
+        error: sent instead of done if the query fails
+    """
+    api_logger.info(f"Received streaming chat query: {query.question[:100]}...")
+
+    async def event_stream():
+        start_time = time.time()
+        answer_parts = []
+        sources = []
+        try:
+            formatted_history = await run_in_threadpool(
+                load_formatted_history, query.session_id)
+            metadata_filter = query_metadata_filter(query)
+
+            generation = get_index_generation()
+            cache_scope = answer_cache_scope(
+                query, formatted_history, metadata_filter)
+            cached, question_embedding = None, None
+            if cache_scope is not None:
+                cached, question_embedding = await run_in_threadpool(
+                    answer_cache.lookup, generation, cache_scope,
+                    query.question, embed_query)
+
+            if cached is not None:
+                yield sse_event("metadata", {
+                    "model": query.model,
+                    "sources": cached.sources,
+                    "retrieval_time": time.time() - start_time,
+                    "cached": True
+                })
+                answer_parts.append(cached.answer)
+                yield sse_event("token", {"delta": cached.answer})
+            else:
+                chain = await run_in_threadpool(
+                    get_rag_chain, model=query.model,
+                    use_hybrid_search=query.use_hybrid_search)
+                with retrieval_options(fusion_method=query.fusion_method.value,
+                                       metadata_filter=metadata_filter):
+                    async for chunk in chain.astream({
+                        "input": query.question,
+                        "chat_history": formatted_history
+                    }):
+                        if "context" in chunk:
+                            sources = describe_sources(chunk["context"])
+                            yield sse_event("metadata", {
+                                "model": query.model,
+                                "sources": sources,
+                                "retrieval_time": time.time() - start_time,
+                                "cached": False
+                            })
+                        if chunk.get("answer"):
+                            answer_parts.append(chunk["answer"])
+                            yield sse_event("token", {"delta": chunk["answer"]})
+
+            processing_time = time.time() - start_time
+            answer = "".join(answer_parts)
+            if cached is None and cache_scope is not None:
+                await run_in_threadpool(
+                    answer_cache.store, generation, cache_scope, query.question, answer, sources,
+                    embed_query, embedding=question_embedding)
+            api_logger.info(
+                f"Streamed answer in {processing_time:.2f} seconds: {answer[:100]}...")
+
+            # Log to database if session_id is provided
+            if query.session_id:
+                log_writer.submit(
+                    session_id=query.session_id,
+                    question=query.question,
+                    answer=answer,
+                    model=query.model,
+                    processing_time=processing_time
+                )
+
+            yield sse_event("done", {
+                "processing_time": processing_time,
+                "model": query.model
+            })
+        except Exception as e:
+            error_id = str(uuid.uuid4())
+            error_msg = f"Error streaming chat query: {str(e)}"
+            api_logger.error(f"{error_msg} (ID: {error_id})")
+            error_logger.error(f"Error ID {error_id}: {error_msg}", exc_info=True)
+            yield sse_event("error", {"message": error_msg, "error_id": error_id})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(
+            update_session_summary, query.session_id) if query.session_id else None
+    )
+
+
 @app.get("/documents", response_model=List[DocumentInfo])
-async def list_documents():
+async def list_documents(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """
+    Get the documents, newest first, all at once or a page at a time.
+
+    Without `limit` or `after` every document is returned. Otherwise a page
+    of `limit` (default PAGE_SIZE) documents is returned; pass the
+    X-Next-Cursor response header back as `after` to get the next page.
+    """
     with PerformanceTimer(api_logger, "list_documents"):
         try:
-            documents = get_all_documents()
+            if limit is None and after is None:
+                documents = get_all_documents()
+                api_logger.info(f"Retrieved {len(documents)} documents")
+                return documents
+            documents, next_cursor = get_documents_page(limit or PAGE_SIZE, after)
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
             api_logger.info(f"Retrieved {len(documents)} documents")
             return documents
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             error_msg = f"Error retrieving documents: {str(e)}"
             api_logger.error(error_msg)
@@ -0,0 +1,131 @@
+"""
+Metadata pre-filtering for retrieval.
+
+A MetadataFilter restricts retrieval to chunks matching file_id, type
+('text'/'image') and page range. It compiles to a boolean bitmap over a
+document list (used by the BM25 engine), to a FAISS IDSelector over index
+positions (used inside FAISS search) and to a SQL condition (used by the
+FTS5 keyword index), so scoped queries only score eligible chunks instead of
+post-filtering after top-k.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+
+
+class MetadataFilter:
+    """Conjunction of optional constraints on chunk metadata."""
+
+    def __init__(
+        self,
+        file_ids: Optional[List[int]] = None,
+        types: Optional[List[str]] = None,
+        page_min: Optional[int] = None,
+        page_max: Optional[int] = None
+    ):
+        self.file_ids = frozenset(file_ids) if file_ids else None
+        self.types = frozenset(types) if types else None
+        self.page_min = page_min
+        self.page_max = page_max
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["MetadataFilter"]:
+        """Build a filter from a request payload, or None if it constrains nothing."""
+        if not data:
+            return None
+        metadata_filter = cls(
+            file_ids=data.get("file_ids"),
+            types=data.get("types"),
+            page_min=data.get("page_min"),
+            page_max=data.get("page_max")
+        )
+        return None if metadata_filter.is_empty() else metadata_filter
+
+    def is_empty(self) -> bool:
+        return (self.file_ids is None and self.types is None
+                and self.page_min is None and self.page_max is None)
+
+    @property
+    def key(self) -> Tuple:
+        """Hashable identity, used to cache compiled bitmaps and selectors."""
+        return (
+            tuple(sorted(self.file_ids)) if self.file_ids is not None else None,
+            tuple(sorted(self.types)) if self.types is not None else None,
+            self.page_min,
+            self.page_max
+        )
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        """Check a single chunk's metadata against the filter."""
+        if self.file_ids is not None and metadata.get("file_id") not in self.file_ids:
+            return False
+        if self.types is not None and metadata.get("type") not in self.types:
+            return False
+        if self.page_min is not None or self.page_max is not None:
+            page = metadata.get("page")
+            if page is None:
+                return False
+            if self.page_min is not None and page < self.page_min:
+                return False
+            if self.page_max is not None and page > self.page_max:
+                return False
+        return True
+
+    def mask(self, documents: List[Document]) -> np.ndarray:
+        """Compile the filter to a boolean bitmap over a document list."""
+        return np.fromiter(
+            (self.matches(doc.metadata) for doc in documents),
+            dtype=bool, count=len(documents))
+
+    def sql_condition(self) -> Tuple[str, List[Any]]:
+        """Compile the filter to a SQL condition over file_id, type and page columns."""
+        clauses = []
+        params = []
+        if self.file_ids is not None:
+            clauses.append(
+                f"file_id IN ({', '.join('?' * len(self.file_ids))})")
+            params.extend(sorted(self.file_ids))
+        if self.types is not None:
+            clauses.append(f"type IN ({', '.join('?' * len(self.types))})")
+            params.extend(sorted(self.types))
+        if self.page_min is not None:
+            clauses.append("page >= ?")
+            params.append(self.page_min)
+        if self.page_max is not None:
+            clauses.append("page <= ?")
+            params.append(self.page_max)
+        return " AND ".join(clauses) or "1", params
+
+    def faiss_positions(self, vectorstore) -> np.ndarray:
+        """Return the FAISS index positions of the chunks matching the filter."""
+        docstore = vectorstore.docstore
+        if hasattr(docstore, "matching_ids"):
+            # The chunk store filters with a query instead of a scan
+            eligible = set(docstore.matching_ids(self))
+            positions = [
+                position
+                for position, docstore_id in vectorstore.index_to_docstore_id.items()
+                if docstore_id in eligible
+            ]
+            return np.asarray(positions, dtype=np.int64)
+        positions = [
+            position
+            for position, docstore_id in vectorstore.index_to_docstore_id.items()
+            if self.matches(docstore.search(docstore_id).metadata)
+        ]
+        return np.asarray(positions, dtype=np.int64)
+
+    def __repr__(self) -> str:
+        return (f"MetadataFilter(file_ids={self.key[0]}, types={self.key[1]}, "
+                f"page_min={self.page_min}, page_max={self.page_max})")
+
+
+def faiss_search_params(positions: np.ndarray) -> faiss.SearchParameters:
+    """Wrap eligible FAISS positions in search parameters with an IDSelector."""
+    selector = faiss.IDSelectorBatch(positions)
+    params = faiss.SearchParameters(sel=selector)
+    # The SWIG wrapper doesn't own the selector; keep it alive with the params
+    params.referenced_objects = [selector]
+    return params
@@ -0,0 +1,168 @@
+"""
+Versioned schema migrations for rag_app.db.
+
+The schema version lives in SQLite's PRAGMA user_version. At startup,
+apply_migrations() runs every migration newer than the database's version,
+each in its own transaction together with the version bump, so schema work
+happens once instead of on the request path.
+
+To change the schema, append a migration with the next version number;
+never edit one that has shipped.
+"""
+
+import sqlite3
+from typing import Callable, List, Tuple, Union
+from logger import db_logger
+
+
+def _column_exists(conn: sqlite3.Connection, table_name: str, column_name: str) -> bool:
+    return any(row[1] == column_name
+               for row in conn.execute(f"PRAGMA table_info({table_name})"))
+
+
+def _add_processing_time(conn: sqlite3.Connection) -> None:
+    # Databases created before migrations may already have the column
+    if not _column_exists(conn, "application_logs", "processing_time"):
+        conn.execute(
+            "ALTER TABLE application_logs ADD COLUMN processing_time REAL")
+
+
+def _create_chunk_fts(conn: sqlite3.Connection) -> None:
+    # The rowid is the chunk ID; the unindexed columns serve metadata filters
+    # and rebuild the Document for a hit
+    try:
+        conn.execute(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5
+               (text, file_id UNINDEXED, page UNINDEXED, type UNINDEXED,
+                metadata UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')""")
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5: keyword search stays on in-memory BM25
+        db_logger.warning(f"FTS5 keyword index unavailable: {str(e)}")
+
+
+def _create_chunks(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS chunks
+           (chunk_id INTEGER PRIMARY KEY,
+            file_id INTEGER,
+            page INTEGER,
+            type TEXT,
+            text TEXT NOT NULL,
+            metadata TEXT NOT NULL)""")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks (file_id)")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'chunk_fts'").fetchone() is None:
+        return
+
+    # chunk_fts becomes an external-content index over chunks, kept in sync
+    # by triggers, instead of a second copy of every chunk
+    conn.execute(
+        """INSERT OR IGNORE INTO chunks (chunk_id, file_id, page, type, text, metadata)
+           SELECT rowid, file_id, page, type, text, metadata FROM chunk_fts""")
+    conn.execute("DROP TABLE chunk_fts")
+    conn.execute(
+        """CREATE VIRTUAL TABLE chunk_fts USING fts5
+           (text, file_id UNINDEXED, page UNINDEXED, type UNINDEXED,
+            metadata UNINDEXED, content = 'chunks', content_rowid = 'chunk_id',
+            tokenize = 'unicode61 remove_diacritics 2')""")
+    conn.execute(
+        """CREATE TRIGGER chunks_fts_insert AFTER INSERT ON chunks BEGIN
+               INSERT INTO chunk_fts (rowid, text, file_id, page, type, metadata)
+               VALUES (new.chunk_id, new.text, new.file_id, new.page, new.type, new.metadata);
+           END""")
+    conn.execute(
+        """CREATE TRIGGER chunks_fts_delete AFTER DELETE ON chunks BEGIN
+               INSERT INTO chunk_fts (chunk_fts, rowid, text, file_id, page, type, metadata)
+               VALUES ('delete', old.chunk_id, old.text, old.file_id, old.page, old.type, old.metadata);
+           END""")
+    conn.execute(
+        """CREATE TRIGGER chunks_fts_update AFTER UPDATE ON chunks BEGIN
+               INSERT INTO chunk_fts (chunk_fts, rowid, text, file_id, page, type, metadata)
+               VALUES ('delete', old.chunk_id, old.text, old.file_id, old.page, old.type, old.metadata);
+               INSERT INTO chunk_fts (rowid, text, file_id, page, type, metadata)
+               VALUES (new.chunk_id, new.text, new.file_id, new.page, new.type, new.metadata);
+           END""")
+    conn.execute("INSERT INTO chunk_fts (chunk_fts) VALUES ('rebuild')")
+
+
+# (version, description, SQL statements or a function taking the connection)
+MIGRATIONS: List[Tuple[int, str, Union[List[str], Callable[[sqlite3.Connection], None]]]] = [
+    (1, "initial schema", [
+        '''CREATE TABLE IF NOT EXISTS application_logs
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            user_query TEXT,
+            gpt_response TEXT,
+            model TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS document_store
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT,
+            upload_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS users
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password_hash TEXT,
+            role TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+    (2, "application_logs.processing_time", _add_processing_time),
+    (3, "session summaries", [
+        '''CREATE TABLE IF NOT EXISTS session_summaries
+           (session_id TEXT PRIMARY KEY,
+            summary TEXT,
+            summarized_through INTEGER DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+    (4, "index application_logs by session", [
+        # Serves the per-session history reads; rowid is implicitly the last
+        # key column, so ORDER BY created_at, id needs no sort either
+        '''CREATE INDEX IF NOT EXISTS idx_application_logs_session_created
+           ON application_logs (session_id, created_at)''',
+    ]),
+    (5, "index document_store for keyset pagination", [
+        '''CREATE INDEX IF NOT EXISTS idx_document_store_upload
+           ON document_store (upload_timestamp, id)''',
+    ]),
+    (6, "FTS5 keyword index over chunks", _create_chunk_fts),
+    (7, "chunk store", _create_chunks),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Bring the database schema up to the latest version.
+
+    Returns:
+        The schema version after migrating
+    """
+    version = get_schema_version(conn)
+    for target, description, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        db_logger.info(
+            f"Applying migration {target}: {description}")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another process may have migrated while we waited for the lock
+            if get_schema_version(conn) >= target:
+                conn.rollback()
+                version = get_schema_version(conn)
+                continue
+            if callable(migration):
+                migration(conn)
+            else:
+                for statement in migration:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+    db_logger.info(f"Database schema at version {version}")
+    return version
@@ -13,12 +13,42 @@ class ModelName(str, Enum):
     # No OpenAI models - removed
 
 
+class FusionMethod(str, Enum):
+    # Rank-based fusion
+    RRF = "rrf"
+    WEIGHTED = "weighted"
+
+    # Score-based fusion
+    MINMAX = "minmax"
+    ZSCORE = "zscore"
+    CONVEX = "convex"
+
+
+class ChunkType(str, Enum):
+    TEXT = "text"
+    IMAGE = "image"
+
+
+class RetrievalFilter(BaseModel):
+    # Restrict retrieval to chunks from these documents
+    file_ids: Optional[List[int]] = None
+    # Restrict retrieval to text chunks and/or image summaries
+    types: Optional[List[ChunkType]] = None
+    # Inclusive page range
+    page_min: Optional[int] = None
+    page_max: Optional[int] = None
+
+
 class QueryInput(BaseModel):
     session_id: Optional[str] = None
     question: str  # Mandatory field
     model: str = "gemini-2.0-flash"  # Changed from ModelName to str to accept any value
     # Whether to use hybrid search (vector + BM25) or just vector search
     use_hybrid_search: bool = True
+    # How vector and keyword results are combined in hybrid search
+    fusion_method: FusionMethod = FusionMethod.RRF
+    # Optional metadata pre-filter applied inside both retrieval legs
+    filter: Optional[RetrievalFilter] = None
 
     # Validator to ensure model is a valid Gemini model
     @field_validator('model')
@@ -40,7 +70,8 @@ class QueryInput(BaseModel):
                     "session_id": "some-uuid-here",
                     "question": "What is RAG?",
                     "model": "gemini-2.0-flash",
-                    "use_hybrid_search": True
+                    "use_hybrid_search": True,
+                    "fusion_method": "rrf"
                 }
             ]
         }
@@ -0,0 +1,167 @@
+"""
+Routing for the history-aware retrieval step.
+
+Reformulating a question against the chat history costs a full LLM round
+trip before retrieval can start. It is only needed when the question
+depends on earlier turns, so this module routes each query either straight
+to the retriever or through the reformulation prompt.
+
+In speculative mode, a question that does need the rewrite also starts
+retrieval on the raw question while the rewrite is in flight. If the
+rewritten question turns out to be close to the raw one, the speculative
+results are used and the rewrite adds no retrieval latency; otherwise the
+retrieval is redone with the rewritten question. That only pays off when
+rewrites mostly restate the question ("And how are BM25 scores
+normalized?"); a rewrite that resolves a pronoun adds the very term the raw
+retrieval lacked, so it is redone and the speculative retrieval is wasted.
+Speculation is therefore opt-in (SPECULATIVE_RETRIEVAL=true).
+"""
+
+import asyncio
+import re
+from typing import Any, Dict, List
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.documents import Document
+from langchain_core.runnables import Runnable, RunnableBranch, RunnableConfig, RunnableLambda
+from logger import model_logger
+
+# Words that usually point back into the conversation ("what about it?")
+_CONTEXT_DEPENDENT_TERMS = frozenset({
+    "it", "its", "this", "that", "these", "those", "they", "them", "their",
+    "he", "she", "him", "her", "his", "hers", "above", "previous", "earlier",
+    "former", "latter", "same", "else", "again", "another", "more", "further",
+})
+
+# Openers that continue the previous turn rather than start a new topic
+_FOLLOW_UP_OPENERS = frozenset({"and", "but", "so", "also", "then", "or"})
+
+_FOLLOW_UP_PHRASES = ("what about", "how about", "why not", "tell me more")
+
+# Questions shorter than this are usually elliptical follow-ups ("why?")
+_MIN_STANDALONE_TOKENS = 4
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Ignored when comparing a rewritten question with the original
+_STOPWORDS = frozenset({
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did",
+    "what", "which", "who", "how", "why", "when", "where", "of", "in", "on",
+    "for", "to", "and", "or", "with", "about", "can", "you", "me", "please",
+})
+
+# Share of the rewritten question's terms that must already appear in the
+# raw question for the speculative retrieval to be kept
+SPECULATIVE_OVERLAP_THRESHOLD = 0.8
+
+
+def is_standalone_question(question: str) -> bool:
+    """
+    Cheap heuristic: can the question be understood without the chat history?
+
+    Errs towards False, since a needless rewrite only costs latency while a
+    missed one retrieves for the wrong question.
+    """
+    text = question.lower().strip()
+    tokens = _TOKEN_PATTERN.findall(text)
+    if len(tokens) < _MIN_STANDALONE_TOKENS:
+        return False
+    if tokens[0] in _FOLLOW_UP_OPENERS or text.startswith(_FOLLOW_UP_PHRASES):
+        return False
+    return not any(token in _CONTEXT_DEPENDENT_TERMS for token in tokens)
+
+
+def _content_terms(text: str) -> set:
+    return {token for token in _TOKEN_PATTERN.findall(text.lower())
+            if token not in _STOPWORDS}
+
+
+def query_overlap(question: str, rewritten: str) -> float:
+    """Fraction of the rewritten question's content terms found in the original."""
+    rewritten_terms = _content_terms(rewritten)
+    if not rewritten_terms:
+        return 1.0
+    return len(rewritten_terms & _content_terms(question)) / len(rewritten_terms)
+
+
+def needs_reformulation(inputs: Dict[str, Any]) -> bool:
+    """Decide whether a chain input has to be rewritten before retrieval."""
+    if not inputs.get("chat_history"):
+        model_logger.info("No chat history, skipping question reformulation")
+        return False
+    if is_standalone_question(inputs["input"]):
+        model_logger.info(
+            "Question looks standalone, skipping question reformulation")
+        return False
+    model_logger.info("Reformulating question against chat history")
+    return True
+
+
+def create_speculative_retriever(
+    rewrite_chain: Runnable,
+    retriever: BaseRetriever,
+    overlap_threshold: float = SPECULATIVE_OVERLAP_THRESHOLD
+) -> Runnable:
+    """
+    Rewrite-then-retrieve that speculatively retrieves for the raw question.
+
+    Only the async path speculates; the sync path rewrites, then retrieves.
+    """
+
+    def rewrite_then_retrieve(inputs: Dict[str, Any], config: RunnableConfig) -> List[Document]:
+        rewritten = rewrite_chain.invoke(inputs, config)
+        return retriever.invoke(rewritten, config)
+
+    async def speculate(inputs: Dict[str, Any], config: RunnableConfig) -> List[Document]:
+        question = inputs["input"]
+        speculative = asyncio.ensure_future(
+            retriever.ainvoke(question, config))
+        try:
+            rewritten = await rewrite_chain.ainvoke(inputs, config)
+        except BaseException:
+            speculative.cancel()
+            raise
+
+        overlap = query_overlap(question, rewritten)
+        if overlap >= overlap_threshold:
+            model_logger.info(
+                f"Speculative retrieval kept (overlap {overlap:.2f}) for: {rewritten[:50]}...")
+            return await speculative
+
+        speculative.cancel()
+        model_logger.info(
+            f"Speculative retrieval discarded (overlap {overlap:.2f}), retrieving for: {rewritten[:50]}...")
+        return await retriever.ainvoke(rewritten, config)
+
+    return RunnableLambda(rewrite_then_retrieve, afunc=speculate,
+                          name="speculative_retriever")
+
+
+def create_routed_history_aware_retriever(
+    llm: BaseLanguageModel,
+    retriever: BaseRetriever,
+    prompt: BasePromptTemplate,
+    speculative: bool = False
+) -> Runnable:
+    """
+    Drop-in replacement for LangChain's create_history_aware_retriever.
+
+    Sends the raw question to the retriever unless needs_reformulation()
+    says the history is required to understand it. With speculative=True,
+    retrieval for the raw question overlaps the rewrite (async only).
+    """
+    rewrite_chain = prompt | llm | StrOutputParser()
+    if speculative:
+        reformulating_retriever = create_speculative_retriever(
+            rewrite_chain, retriever)
+    else:
+        reformulating_retriever = rewrite_chain | retriever
+    return RunnableBranch(
+        (
+            lambda inputs: not needs_reformulation(inputs),
+            (lambda inputs: inputs["input"]) | retriever,
+        ),
+        reformulating_retriever,
+    ).with_config(run_name="chat_retriever_chain")
@@ -0,0 +1,49 @@
+"""
+Single-flight deduplication of concurrent identical work.
+
+When several requests ask for the same thing at once, only the first one
+runs; the others await its result. Keys are removed as soon as the call
+finishes, so this is coalescing of in-flight work, not a cache.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls that share a key."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn(), or the in-flight call with the same key if there is one.
+
+        The shared call is shielded, so a waiter that is cancelled (e.g. its
+        client disconnected) does not cancel it for the others.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.calls += 1
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+
+        def forget(done: asyncio.Future) -> None:
+            if self._calls.get(key) is done:
+                del self._calls[key]
+
+        task.add_done_callback(forget)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "coalesced": self.coalesced
+        }
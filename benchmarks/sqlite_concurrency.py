@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Reader/writer concurrency benchmark for the rag_app.db storage settings.
+
+Runs the same mixed workload (writer threads inserting chat logs one
+commit at a time, reader threads loading session history and the document
+list) against a scratch database twice: once with SQLite's defaults
+(rollback journal, synchronous=FULL, no busy timeout) and once with the
+settings from db_config. Reports throughput, latency and lock errors.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py [--writers 4] [--readers 8] [--seconds 5]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from db_config import configure_connection, pragma_settings  # noqa: E402
+
+DEFAULT_SETTINGS = {
+    "busy_timeout": "0",
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+}
+
+SCHEMA = [
+    '''CREATE TABLE application_logs
+       (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, user_query TEXT,
+        gpt_response TEXT, model TEXT, processing_time REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    '''CREATE TABLE document_store
+       (id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT,
+        upload_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+]
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ops = {"write": 0, "read": 0}
+        self.errors = {"write": 0, "read": 0}
+        self.latencies = {"write": [], "read": []}
+
+    def record(self, kind, started, error=False):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            if error:
+                self.errors[kind] += 1
+            else:
+                self.ops[kind] += 1
+                self.latencies[kind].append(elapsed)
+
+
+def connect(path, settings):
+    # timeout=0 so busy handling comes only from the busy_timeout PRAGMA
+    conn = sqlite3.connect(path, timeout=0, check_same_thread=False)
+    configure_connection(conn, settings)
+    return conn
+
+
+def writer(conn, stats, stop, worker):
+    n = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            conn.execute(
+                "INSERT INTO application_logs (session_id, user_query, gpt_response, model, processing_time) VALUES (?, ?, ?, ?, ?)",
+                (f"session-{worker}-{n % 50}", "question " * 10, "answer " * 100, "gemini-2.0-flash", 1.0))
+            conn.commit()
+            stats.record("write", started)
+        except sqlite3.OperationalError:
+            conn.rollback()
+            stats.record("write", started, error=True)
+        n += 1
+    conn.close()
+
+
+def reader(conn, stats, stop, worker):
+    n = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            if n % 2:
+                conn.execute(
+                    "SELECT user_query, gpt_response FROM application_logs WHERE session_id = ? ORDER BY created_at",
+                    (f"session-{worker % 4}-{n % 50}",)).fetchall()
+            else:
+                conn.execute(
+                    "SELECT id, filename, upload_timestamp FROM document_store ORDER BY upload_timestamp DESC").fetchall()
+            stats.record("read", started)
+        except sqlite3.OperationalError:
+            stats.record("read", started, error=True)
+        n += 1
+    conn.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run(label, settings, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        setup = connect(path, settings)
+        for statement in SCHEMA:
+            setup.execute(statement)
+        setup.executemany("INSERT INTO document_store (filename) VALUES (?)",
+                          [(f"doc-{i}.pdf",) for i in range(200)])
+        setup.commit()
+        setup.close()
+
+        stats = Stats()
+        stop = threading.Event()
+        # Connect before the load starts, so only the workload contends
+        threads = [threading.Thread(target=writer, args=(connect(path, settings), stats, stop, i))
+                   for i in range(writers)]
+        threads += [threading.Thread(target=reader, args=(connect(path, settings), stats, stop, i))
+                    for i in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    print(f"\n{label}: {', '.join(f'{k}={v}' for k, v in settings.items())}")
+    for kind in ("write", "read"):
+        latencies = stats.latencies[kind]
+        print(f"  {kind:5s}: {stats.ops[kind] / seconds:9.1f} ops/s  "
+              f"p50={percentile(latencies, 0.5) * 1000:7.2f} ms  "
+              f"p99={percentile(latencies, 0.99) * 1000:7.2f} ms  "
+              f"locked errors={stats.errors[kind]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    run("Before (SQLite defaults)", DEFAULT_SETTINGS,
+        args.writers, args.readers, args.seconds)
+    run("After (db_config)", pragma_settings(),
+        args.writers, args.readers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Shared pytest fixtures.
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """db_utils pointed at a fresh, migrated database in a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    db_utils = importlib.import_module("db_utils")
+    monkeypatch.setattr(db_utils, "DB_NAME", str(tmp_path / "test.db"))
+    db_utils.initialize_database()
+    return db_utils
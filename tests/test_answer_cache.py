@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the semantic answer cache.
+Uses a toy bag-of-words embedding; no API keys needed.
+"""
+
+import os
+import sys
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from answer_cache import SemanticAnswerCache, normalize_question  # noqa: E402
+from cache_utils import TTLCache  # noqa: E402
+
+VOCABULARY = ["what", "is", "hybrid", "search", "how", "does", "bm25", "work",
+              "explain"]
+
+
+def embed(text):
+    words = normalize_question(text).split()
+    return [float(words.count(term)) for term in VOCABULARY]
+
+
+class CountingEmbed:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return embed(text)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_exact_hit_skips_embedding():
+    cache = SemanticAnswerCache(threshold=0.9)
+    counting = CountingEmbed()
+    scope = ("gemini-2.0-flash", True, "rrf", None)
+    cache.store(0, scope, "What is hybrid search?", "An answer", [], counting)
+    calls = counting.calls
+
+    entry, _ = cache.lookup(0, scope, "  what is HYBRID search ", counting)
+    assert entry.answer == "An answer"
+    assert counting.calls == calls
+
+
+def test_near_duplicate_hit_and_scope_isolation():
+    cache = SemanticAnswerCache(threshold=0.85)
+    scope = ("gemini-2.0-flash", True, "rrf", None)
+    cache.store(0, scope, "What is hybrid search?", "Hybrid", [], embed)
+
+    entry, _ = cache.lookup(0, scope, "hybrid search is what", embed)
+    assert entry is not None and entry.answer == "Hybrid"
+
+    entry, _ = cache.lookup(0, scope, "How does BM25 work?", embed)
+    assert entry is None
+
+    other_scope = ("gemini-2.0-flash", False, "rrf", None)
+    entry, _ = cache.lookup(0, other_scope, "What is hybrid search?", embed)
+    assert entry is None
+
+
+def test_new_index_generation_invalidates():
+    cache = SemanticAnswerCache()
+    scope = ("gemini-2.0-flash", True, "rrf", None)
+    cache.store(0, scope, "What is hybrid search?", "Old", [], embed)
+
+    entry, _ = cache.lookup(1, scope, "What is hybrid search?", embed)
+    assert entry is None
+    assert cache.stats()["size"] == 0
+
+    # Answers generated against the old index are not stored
+    cache.store(0, scope, "What is hybrid search?", "Old", [], embed)
+    assert cache.stats()["size"] == 0
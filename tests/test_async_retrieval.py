@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests that the async retrieval path matches the sync one.
+Uses a fake-embedding FAISS store; no API keys needed.
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_community.vectorstores.faiss import FAISS  # noqa: E402
+from hybrid_search import (  # noqa: E402
+    BM25Retriever, HybridRetriever, VectorRetriever, retrieval_options)
+from metadata_filter import MetadataFilter  # noqa: E402
+
+TEXTS = [
+    "Hybrid search combines vector search and keyword search.",
+    "BM25 ranks documents for keyword search.",
+    "FAISS performs vector similarity search.",
+    "Reciprocal rank fusion merges ranked lists.",
+    "Keyword search with BM25 on page five.",
+    "Vector search with FAISS on page six.",
+]
+
+DOCS = [
+    Document(page_content=text, metadata={
+             "chunk_id": i, "file_id": 1 if i < 3 else 2, "page": i + 1})
+    for i, text in enumerate(TEXTS)
+]
+
+
+def build_retriever():
+    vectorstore = FAISS.from_documents(
+        DOCS, DeterministicFakeEmbedding(size=32),
+        ids=[str(doc.metadata["chunk_id"]) for doc in DOCS])
+    return HybridRetriever(
+        VectorRetriever(vectorstore, k=3, fetch_k=6),
+        BM25Retriever(DOCS, k=3),
+        k=3
+    )
+
+
+def chunk_ids(docs):
+    return [doc.metadata["chunk_id"] for doc in docs]
+
+
+def test_ainvoke_matches_invoke():
+    retriever = build_retriever()
+    query = "keyword search with BM25"
+    assert chunk_ids(asyncio.run(retriever.ainvoke(query))) == chunk_ids(
+        retriever.invoke(query))
+
+
+def test_retrieval_options_reach_async_legs():
+    retriever = build_retriever()
+
+    async def scoped():
+        with retrieval_options(metadata_filter=MetadataFilter(file_ids=[2])):
+            return await retriever.ainvoke("vector search")
+
+    docs = asyncio.run(scoped())
+    assert docs
+    assert all(doc.metadata["file_id"] == 2 for doc in docs)
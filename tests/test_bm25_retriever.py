@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the argpartition top-k selection in CustomBM25Retriever.search.
+Pure in-memory BM25; no API keys or vector store are required.
+"""
+
+import os
+import sys
+import numpy as np
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from langchain_core.documents import Document  # noqa: E402
+from hybrid_search import CustomBM25Retriever  # noqa: E402
+from metadata_filter import MetadataFilter  # noqa: E402
+
+TEXTS = [
+    "keyword search with bm25 ranking",
+    "vector search with faiss",
+    "bm25 bm25 keyword keyword",
+    "unrelated text about cooking",
+    # Identical chunks score the same
+    "duplicate keyword chunk",
+    "duplicate keyword chunk",
+    "duplicate keyword chunk",
+    "search engines rank documents",
+]
+
+DOCS = [Document(page_content=text, metadata={"chunk_id": i, "file_id": 1 if i < 4 else 2})
+        for i, text in enumerate(TEXTS)]
+
+
+def reference_scores(retriever, query):
+    return np.asarray(retriever.bm25.get_scores(retriever._preprocess_text(query)))
+
+
+def test_top_k_matches_full_sort():
+    retriever = CustomBM25Retriever(DOCS, top_k=3)
+    hits = retriever.search("bm25 search")
+    scores = reference_scores(retriever, "bm25 search")
+    expected = np.argsort(-scores, kind="stable")[:3]
+    assert hits.indices.tolist() == expected.tolist()
+    assert np.allclose(hits.scores, scores[expected])
+
+
+def test_k_larger_than_corpus_returns_every_match_once():
+    retriever = CustomBM25Retriever(DOCS, top_k=50)
+    hits = retriever.search("keyword")
+    scores = reference_scores(retriever, "keyword")
+    assert sorted(hits.indices.tolist()) == np.flatnonzero(scores > 0).tolist()
+    assert np.all(np.diff(hits.scores) <= 0)
+
+
+def test_zero_scores_are_dropped():
+    retriever = CustomBM25Retriever(DOCS, top_k=8)
+    assert len(retriever.search("cooking")) == 1
+    assert len(retriever.search("nothing matches this")) == 0
+
+
+def test_ties_at_the_cutoff_keep_the_top_scores():
+    retriever = CustomBM25Retriever(DOCS, top_k=2)
+    # Chunks 4, 5 and 6 tie for the best score; any two of them are a valid top 2
+    hits = retriever.search("duplicate")
+    scores = reference_scores(retriever, "duplicate")
+    assert len(hits) == 2
+    assert set(hits.indices.tolist()) <= {4, 5, 6}
+    assert np.allclose(hits.scores, np.sort(scores)[::-1][:2])
+
+
+def test_filtered_search_maps_back_to_corpus_rows():
+    retriever = CustomBM25Retriever(DOCS, top_k=2)
+    hits = retriever.search("keyword", MetadataFilter(file_ids=[1]))
+    assert set(hits.indices.tolist()) <= {0, 1, 2, 3}
+    assert hits.indices.tolist() == [2, 0]
+    assert [doc.metadata["chunk_id"] for doc in hits.to_documents(DOCS, "bm25_score")] == [2, 0]
+
+    assert len(retriever.search("keyword", MetadataFilter(file_ids=[99]))) == 0
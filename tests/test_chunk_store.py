@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite chunk store behind the FAISS index.
+Uses a temporary database and a fake-embedding FAISS store; no API keys needed.
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_community.vectorstores.faiss import FAISS  # noqa: E402
+import chunk_store  # noqa: E402
+from chunk_store import ChunkDocstore, copy_without_vectors  # noqa: E402
+from hybrid_search import CustomVectorRetriever  # noqa: E402
+from metadata_filter import MetadataFilter  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+
+DOCS = [
+    Document(page_content=f"Chunk {i} about {'images' if i % 3 == 0 else 'text'}.", metadata={
+        "chunk_id": i,
+        "file_id": 1 if i < 4 else 2,
+        "page": i + 1,
+        "type": "image" if i % 3 == 0 else "text",
+        "source": "doc.pdf",
+    })
+    for i in range(8)
+]
+
+
+@pytest.fixture
+def chunks(tmp_path, monkeypatch):
+    path = str(tmp_path / "test.db")
+    apply_migrations(sqlite3.connect(path))
+    chunks = ChunkDocstore(lambda: sqlite3.connect(path))
+    # Unpickling a saved index resolves to this store
+    monkeypatch.setattr(chunk_store, "_chunk_docstore", chunks)
+    return chunks
+
+
+@pytest.fixture
+def vectorstore(chunks):
+    return FAISS.from_documents(
+        DOCS, DeterministicFakeEmbedding(size=32), docstore=chunks,
+        ids=[str(doc.metadata["chunk_id"]) for doc in DOCS])
+
+
+def test_lookups(vectorstore, chunks):
+    assert chunks.search("2").metadata == DOCS[2].metadata
+    assert chunks.search("99") == "ID 99 not found."
+    assert [doc.page_content if doc else None for doc in chunks.mget(["5", "x", "1"])] == [
+        DOCS[5].page_content, None, DOCS[1].page_content]
+    assert chunks.file_chunk_ids(2) == ["4", "5", "6", "7"]
+    assert sorted(chunks.file_ids()) == [1, 2]
+    assert chunks.max_chunk_id() == 7
+    assert sorted(chunks.matching_ids(MetadataFilter(types=["image"], file_ids=[2]))) == ["6"]
+
+
+def test_saved_index_references_the_store(vectorstore, chunks, tmp_path):
+    vectorstore.save_local(str(tmp_path / "index"))
+    loaded = FAISS.load_local(
+        str(tmp_path / "index"), DeterministicFakeEmbedding(size=32),
+        allow_dangerous_deserialization=True)
+    assert loaded.docstore is chunks
+    # The pickle holds the ID map, not the chunks
+    assert os.path.getsize(tmp_path / "index" / "index.pkl") < 1024
+
+
+def test_filtered_search_hydrates_hits_from_the_store(vectorstore):
+    retriever = CustomVectorRetriever(vectorstore, top_k=3, fetch_k=8)
+    docs, scores = retriever.search("chunk", MetadataFilter(types=["image"]))
+    assert sorted(doc.metadata["chunk_id"] for doc in docs) == [0, 3, 6]
+    assert scores.shape == (3,)
+
+
+def test_deleting_a_file_removes_vectors_and_chunks(vectorstore, chunks):
+    vectorstore.delete(chunks.file_chunk_ids(1))
+    assert vectorstore.index.ntotal == 4
+    assert chunks.file_ids() == [2]
+
+    docs, _ = CustomVectorRetriever(vectorstore, top_k=8, fetch_k=8).search("chunk")
+    assert sorted(doc.metadata["chunk_id"] for doc in docs) == [4, 5, 6, 7]
+
+
+def test_copy_without_vectors_leaves_the_original_searchable(vectorstore, chunks):
+    copy = copy_without_vectors(vectorstore, chunks.file_chunk_ids(1))
+    assert copy.index.ntotal == 4
+    assert vectorstore.index.ntotal == 8
+    assert sorted(chunks.file_ids()) == [1, 2]
+
+    # Searches still running on the original find all their chunks
+    docs, _ = CustomVectorRetriever(vectorstore, top_k=8, fetch_k=8).search("chunk")
+    assert len(docs) == 8
+
+    chunks.delete(chunks.file_chunk_ids(1))
+    docs, _ = CustomVectorRetriever(copy, top_k=8, fetch_k=8).search("chunk")
+    assert sorted(doc.metadata["chunk_id"] for doc in docs) == [4, 5, 6, 7]
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for token-budgeted context packing.
+"""
+
+import os
+import sys
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from langchain_core.documents import Document  # noqa: E402
+from context_packer import estimate_tokens, pack_context  # noqa: E402
+
+
+def chunk(chunk_id, text, score, page=1, file_id=1):
+    return Document(page_content=text, metadata={
+        "chunk_id": chunk_id, "file_id": file_id, "page": page,
+        "type": "text", "rrf_score": score})
+
+
+def test_adjacent_chunks_are_merged_without_overlap():
+    docs = [
+        chunk(4, "the quick brown fox jumps", 0.01),
+        chunk(3, "a lazy dog and the quick brown fox", 0.03),
+    ]
+    packed = pack_context(docs, token_budget=1000)
+    assert len(packed) == 1
+    assert packed[0].page_content == "a lazy dog and the quick brown fox jumps"
+    assert packed[0].metadata["chunk_ids"] == [3, 4]
+    assert packed[0].metadata["rrf_score"] == 0.03
+
+
+def test_ordered_by_score_and_contained_text_dropped():
+    docs = [
+        chunk(1, "Hybrid search combines BM25 and vectors.", 0.01, page=1),
+        chunk(7, "FAISS stores the vectors.", 0.05, page=3),
+        Document(page_content="FAISS stores the vectors.",
+                 metadata={"chunk_id": 20, "file_id": 2, "page": 1,
+                           "type": "text", "rrf_score": 0.02}),
+    ]
+    packed = pack_context(docs, token_budget=1000)
+    assert [doc.metadata["chunk_id"] for doc in packed] == [7, 1]
+
+
+def test_budget_stops_packing():
+    docs = [chunk(i * 10, str(i) * 400, 1.0 / (i + 1), page=i)
+            for i in range(5)]
+    packed = pack_context(docs, token_budget=250)
+    assert len(packed) == 2
+    assert sum(estimate_tokens(doc.page_content) for doc in packed) <= 250
+
+    packed = pack_context(docs, token_budget=50)
+    assert len(packed) == 1
+    assert estimate_tokens(packed[0].page_content) <= 50
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-thread SQLite connection pool in db_utils.
+Runs against a temporary database.
+"""
+
+import threading
+
+
+def test_connection_is_reused_within_a_thread(db):
+    first = db.get_db_connection()
+    first.close()
+    assert db.get_db_connection() is first
+
+    other = []
+    thread = threading.Thread(
+        target=lambda: other.append(db.get_db_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+def test_close_rolls_back_uncommitted_work(db):
+    conn = db.get_db_connection()
+    conn.execute(
+        "INSERT INTO application_logs (session_id, user_query) VALUES ('s', 'q')")
+    conn.close()
+    db.insert_application_logs("s", "committed", "a", "gemini-2.0-flash")
+
+    rows = db.get_db_connection().execute(
+        "SELECT user_query FROM application_logs").fetchall()
+    assert [row["user_query"] for row in rows] == ["committed"]
+
+
+def test_failed_write_releases_the_transaction(db):
+    conn = db.get_db_connection()
+    # Aborts the INSERT but, like most errors, not the transaction around it
+    conn.execute(
+        "CREATE TEMP TRIGGER reject_users BEFORE INSERT ON users "
+        "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    conn.close()
+
+    user_id, error = db.create_user("carol", "secret", "user")
+    assert user_id is None and "rejected" in error
+    assert not conn.in_transaction
+
+
+def test_nested_close_keeps_the_callers_transaction(db):
+    conn = db.get_db_connection()
+    conn.execute(
+        "INSERT INTO application_logs (session_id, user_query) VALUES ('s', 'q')")
+    # A helper taking and returning the same pooled connection mid-transaction
+    assert db.count_chat_turns_after("s", 0) == 1
+    assert conn.in_transaction
+    conn.commit()
+    conn.close()
+
+    assert db.count_chat_turns_after("s", 0) == 1
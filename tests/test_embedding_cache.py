@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the query-embedding cache.
+Wraps a fake embedding model; no API keys needed.
+"""
+
+import os
+import sys
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from embedding_cache import CachedQueryEmbeddings, QueryEmbeddingStore  # noqa: E402
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+def test_repeated_queries_skip_the_model():
+    base = CountingEmbedding(size=8)
+    embeddings = CachedQueryEmbeddings(base, maxsize=16)
+
+    first = embeddings.embed_query("What is  hybrid search?")
+    second = embeddings.embed_query(" What is hybrid search? ")
+    assert first == second
+    assert base.calls == 1
+
+    stats = embeddings.stats()
+    assert stats["memory_hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_disk_store_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "query_embeddings.db")
+    base = CountingEmbedding(size=8)
+    CachedQueryEmbeddings(base, store=QueryEmbeddingStore(path)).embed_query(
+        "How does BM25 work?")
+
+    other = CachedQueryEmbeddings(base, store=QueryEmbeddingStore(path))
+    embedding = other.embed_query("How does BM25 work?")
+    assert base.calls == 1
+    assert other.stats()["disk_hits"] == 1
+    assert len(embedding) == 8
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the hybrid search fusion module.
+These tests only need NumPy; no API keys or vector store are required.
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from fusion import FUSION_METHODS, fuse, top_k_indices  # noqa: E402
+
+
+def test_top_k_indices_matches_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.random(500)
+    expected = np.argsort(scores)[::-1][:10]
+    assert top_k_indices(scores, 10).tolist() == expected.tolist()
+    assert top_k_indices(scores, 0).size == 0
+    assert top_k_indices(scores[:3], 10).tolist() == np.argsort(
+        scores[:3])[::-1].tolist()
+
+
+def test_rrf_matches_reference_formula():
+    vector_ids = np.array([10, 20, 30])
+    keyword_ids = np.array([30, 40])
+    result = fuse(vector_ids, keyword_ids, method="rrf", top_k=4, rrf_k=60)
+
+    expected = {
+        10: 1 / 60,
+        20: 1 / 61,
+        30: 1 / 62 + 1 / 60,
+        40: 1 / 61,
+    }
+    assert result.ids.tolist()[0] == 30
+    for doc_id, score in zip(result.ids.tolist(), result.scores.tolist()):
+        assert score == pytest.approx(expected[doc_id])
+
+
+def test_ranks_are_reported_per_leg():
+    result = fuse(np.array([1, 2]), np.array([2, 3]), method="rrf", top_k=3)
+    ranks = {doc_id: (v, k) for doc_id, v, k in zip(
+        result.ids.tolist(), result.vector_ranks.tolist(), result.keyword_ranks.tolist())}
+    assert ranks == {1: (0, -1), 2: (1, 0), 3: (-1, 1)}
+
+
+def test_score_methods_use_raw_scores():
+    # The keyword leg strongly prefers 3 over 4; rank-only fusion can't see that
+    vector_ids = np.array([1, 2])
+    keyword_ids = np.array([3, 4])
+    vector_scores = np.array([0.50, 0.49])
+    keyword_scores = np.array([12.0, 0.1])
+
+    result = fuse(vector_ids, keyword_ids, vector_scores, keyword_scores,
+                  method="minmax", top_k=4, weight_vector=0.5, weight_keyword=0.5)
+    assert set(result.ids.tolist()[:2]) == {1, 3}
+
+    result = fuse(vector_ids, keyword_ids, vector_scores, keyword_scores,
+                  method="convex", top_k=4, weight_vector=0.5, weight_keyword=0.5)
+    assert result.ids.tolist()[0] == 3
+
+
+@pytest.mark.parametrize("method", FUSION_METHODS)
+def test_all_methods_handle_empty_legs(method):
+    result = fuse(np.array([5, 6]), np.array([], dtype=np.int64),
+                  method=method, top_k=5)
+    assert sorted(result.ids.tolist()) == [5, 6]
+
+    result = fuse(np.array([], dtype=np.int64), np.array([], dtype=np.int64),
+                  method=method, top_k=5)
+    assert len(result) == 0
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        fuse(np.array([1]), np.array([1]), method="borda")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for windowed chat history with a rolling summary.
+Runs against a temporary SQLite database with a fake summarizer.
+"""
+
+import itertools
+
+
+_turn_numbers = {}
+
+
+def log_turns(db_utils, session_id, count):
+    numbers = _turn_numbers.setdefault(
+        (db_utils.DB_NAME, session_id), itertools.count())
+    for i in itertools.islice(numbers, count):
+        db_utils.insert_application_logs(
+            session_id, f"question {i}", f"answer {i}", "gemini-2.0-flash")
+
+
+def test_history_is_windowed_and_summarized(db):
+    from history_manager import HistoryManager
+
+    calls = []
+
+    def summarize(summary, turns):
+        calls.append([turn["question"] for turn in turns])
+        return (summary + "; " if summary else "") + ", ".join(
+            turn["question"] for turn in turns)
+
+    manager = HistoryManager(summarize, window_turns=2, summary_batch=2)
+    log_turns(db, "s1", 3)
+    assert manager.update("s1") is False
+    assert len(manager.load("s1")) == 6
+
+    log_turns(db, "s1", 1)
+    assert manager.update("s1") is True
+    assert calls == [["question 0", "question 1"]]
+
+    history = manager.load("s1")
+    assert history[0] == (
+        "ai", "Summary of our earlier conversation: question 0, question 1")
+    assert [message for role, message in history[1:] if role == "human"] == [
+        "question 2", "question 3"]
+
+    # Unsummarized turns older than the window stay verbatim until a batch is due
+    log_turns(db, "s1", 1)
+    assert manager.update("s1") is False
+    assert len(manager.load("s1")) == 1 + 2 * 3
+
+    log_turns(db, "s1", 1)
+    assert manager.update("s1") is True
+    history = manager.load("s1")
+    assert history[0][1].endswith("question 0, question 1; question 2, question 3")
+    assert len(history) == 1 + 2 * 2
+
+
+def test_sessions_are_independent(db):
+    from history_manager import HistoryManager
+
+    manager = HistoryManager(lambda summary, turns: "s", window_turns=2)
+    log_turns(db, "a", 2)
+    log_turns(db, "b", 1)
+    assert len(manager.load("a")) == 4
+    assert len(manager.load("b")) == 2
+    assert manager.load("missing") == []
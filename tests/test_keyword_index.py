@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite FTS5 keyword backend.
+Uses a temporary database and a fake-embedding FAISS store; no API keys needed.
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_community.vectorstores.faiss import FAISS  # noqa: E402
+import hybrid_search  # noqa: E402
+from hybrid_search import (CustomBM25Retriever, CustomFTS5Retriever,  # noqa: E402
+                           create_hybrid_retriever_from_faiss)
+from chunk_store import ChunkDocstore  # noqa: E402
+from keyword_index import FTS5KeywordIndex, match_expression  # noqa: E402
+from metadata_filter import MetadataFilter  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+
+TEXTS = [
+    "Hybrid search combines vector search and keyword search.",
+    "BM25 ranks documents for keyword search.",
+    "FAISS performs vector similarity search.",
+    "IMAGE: architecture diagram of the search service.",
+    "Keyword search with BM25 on page five.",
+    "Vector search with FAISS on page six.",
+]
+
+DOCS = [
+    Document(page_content=text, metadata={
+        "chunk_id": i,
+        "file_id": 1 if i < 3 else 2,
+        "page": i + 1,
+        "type": "image" if text.startswith("IMAGE") else "text",
+    })
+    for i, text in enumerate(TEXTS)
+]
+
+
+@pytest.fixture
+def chunks(tmp_path):
+    path = str(tmp_path / "test.db")
+    apply_migrations(sqlite3.connect(path))
+    chunks = ChunkDocstore(lambda: sqlite3.connect(path))
+    chunks.add({str(doc.metadata["chunk_id"]): doc for doc in DOCS})
+    return chunks
+
+
+@pytest.fixture
+def index(chunks):
+    return FTS5KeywordIndex(chunks.connect)
+
+
+def test_match_expression_quotes_terms():
+    assert match_expression('What is "BM25"? (AND) bm25') == '"what" OR "is" OR "bm25" OR "and"'
+    assert match_expression("?!") is None
+
+
+def test_search_ranks_like_bm25(index):
+    hits = index.search("BM25 keyword", top_k=3)
+    top = [doc.metadata["chunk_id"] for doc, _ in hits]
+    assert set(top[:2]) == {1, 4}
+    assert all(score > 0 for _, score in hits)
+
+    bm25_hits = CustomBM25Retriever(DOCS, top_k=3).search("BM25 keyword")
+    assert set(top[:2]) == set(bm25_hits.indices.tolist()[:2])
+
+
+def test_search_applies_metadata_filter(index):
+    hits = index.search("search", top_k=6,
+                        metadata_filter=MetadataFilter(file_ids=[2], types=["text"]))
+    assert sorted(doc.metadata["chunk_id"] for doc, _ in hits) == [4, 5]
+
+    hits = index.search("search", top_k=6, metadata_filter=MetadataFilter(page_max=2))
+    assert sorted(doc.metadata["chunk_id"] for doc, _ in hits) == [0, 1]
+
+
+def test_index_follows_chunk_store(chunks, index):
+    # Re-adding a chunk replaces its text in the index
+    chunks.add({"1": Document(page_content="Sparse lexical ranking.",
+                              metadata=DOCS[1].metadata)})
+    assert [doc.id for doc, _ in index.search("lexical", top_k=6)] == ["1"]
+    assert "1" not in [doc.id for doc, _ in index.search("BM25", top_k=6)]
+
+    chunks.delete(chunks.file_chunk_ids(1))
+    assert all(doc.metadata["file_id"] == 2 for doc, _ in index.search("search", top_k=6))
+
+
+def test_retriever_contract(index):
+    results = CustomFTS5Retriever(index, top_k=2).get_relevant_documents("FAISS vector")
+    assert len(results) == 2
+    assert {doc.metadata["chunk_id"] for doc in results} <= {0, 2, 5}
+    assert all(doc.metadata["bm25_score"] > 0 for doc in results)
+
+
+def test_hybrid_retriever_selects_fts5_backend(index, monkeypatch):
+    monkeypatch.setattr(hybrid_search, "keyword_index_if_available", lambda: index)
+    vectorstore = FAISS.from_documents(
+        DOCS, DeterministicFakeEmbedding(size=32),
+        ids=[str(doc.metadata["chunk_id"]) for doc in DOCS])
+
+    retriever = create_hybrid_retriever_from_faiss(
+        vectorstore, k=3, fetch_k=6, keyword_backend="fts5")
+    assert isinstance(retriever._custom_retriever.keyword_retriever, CustomFTS5Retriever)
+
+    results = retriever.invoke("BM25 keyword search")
+    assert len(results) == 3
+    assert any(doc.metadata["keyword_rank"] is not None for doc in results)
+
+    with pytest.raises(ValueError):
+        create_hybrid_retriever_from_faiss(vectorstore, keyword_backend="lucene")
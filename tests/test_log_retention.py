@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the application_logs retention and compaction job.
+Runs against a temporary SQLite database.
+"""
+
+import gzip
+import json
+import os
+import types
+
+import pytest
+
+
+def log_turns(db, session_id, days_ago, count, text="x"):
+    conn = db.get_db_connection()
+    conn.executemany(
+        '''INSERT INTO application_logs (session_id, user_query, gpt_response, model, created_at)
+           VALUES (?, ?, ?, 'gemini-2.0-flash', datetime('now', ?))''',
+        [(session_id, f"q{i} {text}", f"a{i} {text}", f"-{days_ago} days") for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+def read_archive(archive_dir):
+    rows = []
+    for name in sorted(os.listdir(archive_dir)):
+        with gzip.open(os.path.join(archive_dir, name), "rt") as f:
+            rows.extend(json.loads(line) for line in f)
+    return rows
+
+
+def session_rows(db, session_id):
+    return db.get_db_connection().execute(
+        "SELECT COUNT(*) FROM application_logs WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+
+def test_parse_policies(db):
+    from log_retention import parse_policies
+    assert parse_policies("compact:30, archive:180") == [
+        ("compact", 30.0), ("archive", 180.0)]
+    assert parse_policies(None) == []
+    with pytest.raises(ValueError):
+        parse_policies("shred:30")
+    with pytest.raises(ValueError):
+        parse_policies("delete:0")
+
+
+def test_archive_policy_requires_archive_dir(db, tmp_path):
+    from log_retention import LogRetentionJob
+    # Archiving without somewhere to write would silently delete instead
+    with pytest.raises(ValueError):
+        LogRetentionJob([("compact", 30), ("archive", 180)])
+    LogRetentionJob([("delete", 180)])
+    LogRetentionJob([("archive", 180)], archive_dir=str(tmp_path / "archive"))
+
+
+def test_compact_only_removes_old_summarized_turns(db):
+    from log_retention import LogRetentionJob
+    log_turns(db, "s1", days_ago=40, count=6)
+    log_turns(db, "s1", days_ago=1, count=4)
+    ids = [row[0] for row in db.get_db_connection().execute(
+        "SELECT id FROM application_logs WHERE session_id = 's1' ORDER BY id")]
+    # The summary covers 4 old turns and 2 recent ones
+    db.upsert_session_summary("s1", "summary", ids[3])
+    log_turns(db, "s2", days_ago=40, count=3)
+
+    counts = LogRetentionJob([("compact", 30)], batch_size=2, pause=0).run_once()
+    assert counts["compacted"] == 4
+    assert session_rows(db, "s1") == 6
+    assert session_rows(db, "s2") == 3
+
+
+def test_archive_exports_and_deletes_idle_sessions(db, tmp_path):
+    from log_retention import LogRetentionJob
+    log_turns(db, "idle", days_ago=200, count=5)
+    db.upsert_session_summary("idle", "summary", 1)
+    # Old turns, but the session is still in use
+    log_turns(db, "active", days_ago=200, count=2)
+    log_turns(db, "active", days_ago=0, count=1)
+
+    job = LogRetentionJob([("archive", 180)], batch_size=2, pause=0,
+                          archive_dir=str(tmp_path / "archive"))
+    counts = job.run_once()
+    assert counts["archived"] == 5
+    assert counts["sessions_expired"] == 1
+    assert session_rows(db, "idle") == 0
+    assert session_rows(db, "active") == 3
+    assert db.get_session_summary("idle") is None
+
+    rows = read_archive(tmp_path / "archive")
+    assert [row["user_query"] for row in rows] == [f"q{i} x" for i in range(5)]
+    assert {row["session_id"] for row in rows} == {"idle"}
+
+
+def test_pending_archives_are_settled_by_the_next_run(db, tmp_path):
+    from log_retention import LogRetentionJob
+    log_turns(db, "s1", days_ago=200, count=4)
+    archive_dir = tmp_path / "archive"
+    job = LogRetentionJob([("archive", 180)], batch_size=2, pause=0,
+                          archive_dir=str(archive_dir))
+    rows = db.get_db_connection().execute(
+        "SELECT * FROM application_logs ORDER BY id").fetchall()
+    # Died before its delete committed: the rows are still there
+    job._write_pending_archive([tuple(row) for row in rows[:2]])
+    # Died after its delete committed, before the rename
+    job._write_pending_archive([tuple(row) for row in rows[2:]])
+    conn = db.get_db_connection()
+    conn.execute("DELETE FROM application_logs WHERE id IN (?, ?)", (rows[2]["id"], rows[3]["id"]))
+    conn.commit()
+    conn.close()
+
+    assert job.run_once()["archived"] == 2
+    assert not [name for name in os.listdir(archive_dir) if name.endswith(".pending")]
+    # Every row archived exactly once
+    assert sorted(row["id"] for row in read_archive(archive_dir)) == [row["id"] for row in rows]
+
+
+def test_stop_interrupts_a_session_between_batches(db, monkeypatch):
+    import log_retention
+    log_turns(db, "big", days_ago=200, count=10)
+    job = log_retention.LogRetentionJob([("delete", 180)], batch_size=2, pause=0)
+    # stop() arrives while the first batch is pausing
+    monkeypatch.setattr(log_retention, "time",
+                        types.SimpleNamespace(sleep=lambda _: job._stop.set()))
+
+    assert job.run_once()["deleted"] == 2
+    assert session_rows(db, "big") == 8
+
+
+def test_delete_frees_pages_with_incremental_vacuum(db):
+    from log_retention import LogRetentionJob
+    conn = db.get_db_connection()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    log_turns(db, "old", days_ago=100, count=200, text="y" * 2000)
+
+    job = LogRetentionJob([("delete", 90)], batch_size=50, pause=0)
+    counts = job.run_once()
+    assert counts["deleted"] == 200
+    assert counts["pages_freed"] > 0
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert job.stats()["totals"]["deleted"] == 200
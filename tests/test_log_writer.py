@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for the background batched chat log writer.
+Runs against a temporary SQLite database.
+"""
+
+
+def count_logs(db_utils, session_id):
+    return db_utils.get_db_connection().execute(
+        "SELECT COUNT(*) FROM application_logs WHERE session_id = ?",
+        (session_id,)).fetchone()[0]
+
+
+def test_logs_are_batched_and_readable_after_wait(db):
+    from log_writer import BatchedLogWriter
+
+    writer = BatchedLogWriter(batch_size=10, flush_interval=0.05)
+    for i in range(25):
+        assert writer.submit("s1", f"q{i}", f"a{i}", "gemini-2.0-flash")
+    assert writer.wait_until_written("s1", timeout=5)
+    assert count_logs(db, "s1") == 25
+
+    stats = writer.stats()
+    assert stats["written"] == 25 and stats["dropped"] == 0
+    assert stats["batches"] <= 5
+    writer.stop()
+
+
+def test_full_queue_drops_and_stop_flushes(db):
+    from log_writer import BatchedLogWriter
+
+    writer = BatchedLogWriter(max_queue=2, batch_size=10, flush_interval=0.05)
+    # Fill the queue before the writer thread can drain it
+    writer.start = lambda: None
+    results = [writer.submit("s2", f"q{i}", "a", "gemini-2.0-flash")
+               for i in range(3)]
+    assert results == [True, True, False]
+    assert writer.stats()["dropped"] == 1
+
+    del writer.start
+    writer.start()
+    writer.stop()
+    assert count_logs(db, "s2") == 2
+    assert writer.flush(timeout=1)
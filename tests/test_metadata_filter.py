@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for metadata pre-filtering in the retrieval legs.
+Uses an in-memory BM25 corpus and a fake-embedding FAISS store; no API keys needed.
+"""
+
+import os
+import sys
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_community.vectorstores.faiss import FAISS  # noqa: E402
+from metadata_filter import MetadataFilter  # noqa: E402
+from hybrid_search import CustomBM25Retriever, CustomVectorRetriever  # noqa: E402
+
+TEXTS = [
+    "Hybrid search combines vector search and keyword search.",
+    "BM25 ranks documents for keyword search.",
+    "FAISS performs vector similarity search.",
+    "IMAGE: architecture diagram of the search service.",
+    "Keyword search with BM25 on page five.",
+    "Vector search with FAISS on page six.",
+]
+
+DOCS = [
+    Document(page_content=text, metadata={
+        "chunk_id": i,
+        "file_id": 1 if i < 3 else 2,
+        "page": i + 1,
+        "type": "image" if text.startswith("IMAGE") else "text",
+    })
+    for i, text in enumerate(TEXTS)
+]
+
+
+def test_filter_matching():
+    metadata_filter = MetadataFilter(file_ids=[2], types=["text"], page_min=5)
+    assert metadata_filter.mask(DOCS).tolist() == [
+        False, False, False, False, True, True]
+    assert MetadataFilter.from_dict({"file_ids": None}) is None
+
+
+def test_bm25_only_scores_eligible_chunks():
+    retriever = CustomBM25Retriever(DOCS, top_k=5)
+    hits = retriever.search("keyword search BM25",
+                            MetadataFilter(file_ids=[2]))
+    assert len(hits) > 0
+    assert all(DOCS[idx].metadata["file_id"] == 2 for idx in hits.indices)
+
+    hits = retriever.search("keyword search", MetadataFilter(file_ids=[99]))
+    assert len(hits) == 0
+
+
+def test_vector_search_uses_id_selector():
+    vectorstore = FAISS.from_documents(
+        DOCS, DeterministicFakeEmbedding(size=32),
+        ids=[str(doc.metadata["chunk_id"]) for doc in DOCS])
+    retriever = CustomVectorRetriever(vectorstore, top_k=3, fetch_k=6)
+
+    docs, scores = retriever.search(
+        "vector search", MetadataFilter(types=["image"]))
+    assert [doc.metadata["chunk_id"] for doc in docs] == [3]
+    assert scores.shape == (1,)
+
+    docs, _ = retriever.search("vector search", MetadataFilter(page_max=2))
+    assert sorted(doc.metadata["chunk_id"] for doc in docs) == [0, 1]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned schema migrations.
+"""
+
+import os
+import sqlite3
+import sys
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from migrations import MIGRATIONS, apply_migrations, get_schema_version  # noqa: E402
+
+
+def columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_fresh_database_reaches_latest_version():
+    conn = sqlite3.connect(":memory:")
+    assert apply_migrations(conn) == MIGRATIONS[-1][0]
+    assert "processing_time" in columns(conn, "application_logs")
+    # Running again is a no-op
+    assert apply_migrations(conn) == MIGRATIONS[-1][0]
+
+
+def test_legacy_database_with_processing_time_is_adopted():
+    conn = sqlite3.connect(":memory:")
+    conn.execute('''CREATE TABLE application_logs
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT,
+                     user_query TEXT, gpt_response TEXT, model TEXT,
+                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                     processing_time REAL)''')
+    conn.execute(
+        "INSERT INTO application_logs (session_id, user_query) VALUES ('s', 'q')")
+    conn.commit()
+    assert get_schema_version(conn) == 0
+
+    apply_migrations(conn)
+    assert columns(conn, "application_logs").count("processing_time") == 1
+    assert conn.execute(
+        "SELECT COUNT(*) FROM application_logs").fetchone()[0] == 1
+
+
+def test_keyword_index_moves_into_chunk_store(monkeypatch):
+    import migrations
+    conn = sqlite3.connect(":memory:")
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS[:6])
+    apply_migrations(conn)
+    conn.execute(
+        """INSERT INTO chunk_fts (rowid, text, file_id, page, type, metadata)
+           VALUES (7, 'keyword search', 1, 2, 'text', '{"chunk_id": 7}')""")
+    conn.commit()
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS)
+    apply_migrations(conn)
+    assert conn.execute("SELECT chunk_id, file_id, text FROM chunks").fetchall() == [
+        (7, 1, "keyword search")]
+    assert conn.execute(
+        "SELECT rowid FROM chunk_fts WHERE chunk_fts MATCH 'keyword'").fetchall() == [(7,)]
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized MMR implementation.
+Checks selections against LangChain's reference MMR on random vectors.
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from mmr import mmr_select  # noqa: E402
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.5, 0.75, 1.0])
+def test_matches_langchain_reference(lambda_mult):
+    rng = np.random.default_rng(42)
+    query = rng.normal(size=64).astype(np.float32)
+    candidates = rng.normal(size=(120, 64)).astype(np.float32)
+
+    expected = maximal_marginal_relevance(
+        query, candidates, lambda_mult=lambda_mult, k=6)
+    selected = mmr_select(query, candidates, k=6, lambda_mult=lambda_mult)
+    assert selected.tolist() == expected
+
+
+def test_skips_near_duplicates():
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([
+        [1.0, 0.05, 0.0],
+        [1.0, 0.06, 0.0],  # near duplicate of the first
+        [0.7, 0.0, 0.7],
+    ])
+    assert mmr_select(query, candidates, k=2,
+                      lambda_mult=0.5).tolist() == [0, 2]
+
+
+def test_k_larger_than_candidates():
+    candidates = np.eye(3)
+    assert sorted(mmr_select(np.ones(3), candidates, k=10).tolist()) == [
+        0, 1, 2]
+    assert mmr_select(np.ones(3), np.empty((0, 3)), k=3).size == 0
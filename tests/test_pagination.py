@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination of documents and users in db_utils.
+Runs against a temporary database.
+"""
+
+import pytest
+
+
+def collect(fetch_page, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch_page(limit, cursor)
+        items.extend(page)
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+
+def test_documents_pages_cover_everything_newest_first(db):
+    conn = db.get_db_connection()
+    # Several uploads share a timestamp, so the id tie-breaker matters
+    conn.executemany(
+        "INSERT INTO document_store (filename, upload_timestamp) VALUES (?, ?)",
+        [(f"doc-{i}.pdf", f"2024-01-01 00:00:{i // 3:02d}") for i in range(25)])
+    conn.commit()
+    conn.close()
+
+    documents, pages = collect(db.get_documents_page, 10)
+    assert pages == 3
+    assert documents == db.get_all_documents()
+
+
+def test_users_pages_cover_everything(db):
+    for i in range(7):
+        db.create_user(f"user{i}", "password", "user")
+    expected = db.get_all_users()
+
+    users, pages = collect(db.get_users_page, 3)
+    assert users == expected
+    assert pages == (len(expected) + 2) // 3
+
+
+def test_last_page_has_no_cursor(db):
+    documents, cursor = db.get_documents_page(10)
+    assert documents == []
+    assert cursor is None
+
+
+def test_malformed_cursor_is_rejected(db):
+    with pytest.raises(ValueError):
+        db.get_documents_page(10, "not-a-cursor")
+    with pytest.raises(ValueError):
+        db.get_users_page(10, db.encode_cursor(1, 2))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests: hot db_utils queries must use their indexes.
+The statements checked are the ones db_utils actually issues, captured with
+a trace callback while calling it against a temporary database.
+"""
+
+import pytest
+
+SESSION_INDEX = "idx_application_logs_session_created"
+
+
+@pytest.fixture
+def conn(db):
+    conn = db.get_db_connection()
+    conn.executemany(
+        "INSERT INTO application_logs (session_id, user_query, gpt_response) VALUES (?, 'q', 'a')",
+        [(f"session-{i % 100}",) for i in range(1000)])
+    conn.executemany(
+        "INSERT INTO document_store (filename, upload_timestamp) VALUES (?, ?)",
+        [(f"doc-{i}.pdf", f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}") for i in range(500)])
+    conn.commit()
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+
+def traced_selects(conn, call):
+    """Run call and return the SELECT statements it ran, with parameters bound."""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def query_plan(conn, sql):
+    return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+@pytest.mark.parametrize("call", [
+    lambda db: db.get_recent_chat_history("session-1", 6),
+    lambda db: db.get_chat_history_after("session-1", 500, 6),
+    lambda db: db.count_chat_turns_after("session-1", 500),
+], ids=["get_recent_chat_history", "get_chat_history_after", "count_chat_turns_after"])
+def test_history_queries_use_session_index(db, conn, call):
+    [sql] = traced_selects(conn, lambda: call(db))
+    plan = query_plan(conn, sql)
+    assert SESSION_INDEX in plan
+    assert "SCAN application_logs" not in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_documents_page_uses_upload_index(db, conn):
+    _, cursor = db.get_documents_page(100)
+    # The first page and the ones after it run different queries
+    for after in (None, cursor):
+        [sql] = traced_selects(conn, lambda: db.get_documents_page(100, after))
+        plan = query_plan(conn, sql)
+        assert "idx_document_store_upload" in plan
+        assert "TEMP B-TREE" not in plan
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for routing questions around the history reformulation step.
+Uses a fake chat model, so no API keys are needed.
+"""
+
+import asyncio
+import os
+import sys
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from query_routing import (SPECULATIVE_OVERLAP_THRESHOLD, create_routed_history_aware_retriever,  # noqa: E402
+                           is_standalone_question, query_overlap)
+
+HISTORY = [("human", "What is FAISS?"), ("ai", "A similarity search library.")]
+
+
+def test_standalone_heuristic():
+    assert is_standalone_question(
+        "What fields does the payment API return on success?")
+    assert not is_standalone_question("Why?")
+    assert not is_standalone_question("What about the refund endpoint?")
+    assert not is_standalone_question("How does it handle PII data?")
+    assert not is_standalone_question("And the error codes for refunds?")
+
+
+def _build(llm, speculative=False):
+    queries = []
+
+    def retrieve(query):
+        queries.append(query)
+        return [Document(page_content=query)]
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "Given chat history and a question, reformulate it to be standalone."),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}")
+    ])
+    return create_routed_history_aware_retriever(
+        llm, RunnableLambda(retrieve), prompt, speculative=speculative), queries
+
+
+def test_reformulation_skipped_without_history_or_for_standalone_questions():
+    llm = FakeListChatModel(responses=["SHOULD NOT BE USED"])
+    retriever, queries = _build(llm)
+
+    retriever.invoke({"input": "Why?", "chat_history": []})
+    retriever.invoke({"input": "What fields does the payment API return?",
+                      "chat_history": HISTORY})
+    assert queries == ["Why?", "What fields does the payment API return?"]
+
+
+def test_follow_up_is_reformulated():
+    llm = FakeListChatModel(responses=["Who develops FAISS?"])
+    retriever, queries = _build(llm)
+
+    retriever.invoke({"input": "Who develops it?", "chat_history": HISTORY})
+    assert queries == ["Who develops FAISS?"]
+
+
+def test_query_overlap():
+    assert query_overlap("How is the index built?",
+                         "How is the FAISS index built?") < 0.8
+    assert query_overlap("How are BM25 scores normalized?",
+                         "How are the BM25 scores normalized?") == 1.0
+
+
+def test_speculative_retrieval_kept_when_rewrite_is_close():
+    llm = FakeListChatModel(responses=["How are the BM25 scores normalized?"])
+    retriever, queries = _build(llm, speculative=True)
+
+    docs = asyncio.run(retriever.ainvoke(
+        {"input": "And how are BM25 scores normalized?", "chat_history": HISTORY}))
+    assert queries == ["And how are BM25 scores normalized?"]
+    assert docs[0].page_content == "And how are BM25 scores normalized?"
+
+
+def test_speculative_retrieval_redone_when_rewrite_diverges():
+    llm = FakeListChatModel(responses=["Who develops FAISS?"])
+    retriever, queries = _build(llm, speculative=True)
+
+    docs = asyncio.run(retriever.ainvoke(
+        {"input": "Who develops it?", "chat_history": HISTORY}))
+    assert queries == ["Who develops it?", "Who develops FAISS?"]
+    assert docs[0].page_content == "Who develops FAISS?"
+
+
+def test_speculative_retrieval_redone_when_rewrite_resolves_a_pronoun():
+    history = [("human", "What is the Transformer model?"),
+               ("ai", "A sequence model built on attention.")]
+    rewritten = "What is the training cost of the Transformer model?"
+    assert query_overlap("What about its training cost?", rewritten) < SPECULATIVE_OVERLAP_THRESHOLD
+
+    llm = FakeListChatModel(responses=[rewritten])
+    retriever, queries = _build(llm, speculative=True)
+    docs = asyncio.run(retriever.ainvoke(
+        {"input": "What about its training cost?", "chat_history": history}))
+    assert queries == ["What about its training cost?", rewritten]
+    assert docs[0].page_content == rewritten
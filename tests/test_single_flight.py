@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for single-flight coalescing of concurrent identical requests.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the api directory to the path so we can import its modules
+sys.path.append(os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from single_flight import SingleFlight  # noqa: E402
+
+
+def test_concurrent_identical_calls_share_one_run():
+    flights = SingleFlight()
+    runs = []
+
+    async def answer(question):
+        runs.append(question)
+        await asyncio.sleep(0.01)
+        return f"answer to {question}"
+
+    async def main():
+        return await asyncio.gather(
+            flights.run("a", lambda: answer("a")),
+            flights.run("a", lambda: answer("a")),
+            flights.run("b", lambda: answer("b")),
+        )
+
+    results = asyncio.run(main())
+    assert results == ["answer to a", "answer to a", "answer to b"]
+    assert sorted(runs) == ["a", "b"]
+    assert flights.stats() == {"in_flight": 0, "calls": 2, "coalesced": 1}
+
+
+def test_errors_reach_every_waiter_and_key_is_released():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model unavailable")
+
+    async def main():
+        results = await asyncio.gather(
+            flights.run("a", fail), flights.run("a", fail),
+            return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await flights.run("a", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(main()) == "ok"
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flights.run("a", slow))
+        second = asyncio.ensure_future(flights.run("a", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
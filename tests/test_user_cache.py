@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the user lookup cache in db_utils.
+Runs against a temporary database.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def db(db):
+    # Users cached by earlier tests belong to their own temporary databases
+    db.invalidate_user_cache()
+    return db
+
+
+def count_queries(db, monkeypatch):
+    calls = []
+    original = db.get_db_connection
+    monkeypatch.setattr(db, "get_db_connection",
+                        lambda: calls.append(1) or original())
+    return calls
+
+
+def test_lookups_are_served_from_cache(db, monkeypatch):
+    user_id, _ = db.create_user("alice", "secret", "user")
+    calls = count_queries(db, monkeypatch)
+
+    assert db.get_user_by_id(user_id)["username"] == "alice"
+    assert db.get_user_by_id(user_id)["username"] == "alice"
+    assert db.authenticate_user("alice", "secret")["id"] == user_id
+    assert db.authenticate_user("alice", "wrong") is None
+    assert len(calls) == 2
+
+    # Callers get copies
+    db.get_user_by_id(user_id)["role"] = "admin"
+    assert db.get_user_by_id(user_id)["role"] == "user"
+
+
+def test_writes_invalidate(db):
+    user_id, _ = db.create_user("bob", "secret", "user")
+    assert db.authenticate_user("bob", "secret")
+
+    db.update_user_password(user_id, "changed")
+    assert db.authenticate_user("bob", "secret") is None
+    assert db.authenticate_user("bob", "changed")["id"] == user_id
+
+    db.get_user_by_id(user_id)
+    db.modify_username(user_id, "robert")
+    assert db.get_user_by_id(user_id)["username"] == "robert"
+    assert db.get_user_by_username("bob") is None
+    assert db.authenticate_user("robert", "changed")
+
+    db.delete_user(user_id)
+    assert db.get_user_by_id(user_id) is None
+    assert db.authenticate_user("robert", "changed") is None
+
+
+def test_missing_users_are_not_cached(db):
+    assert db.get_user_by_username("carol") is None
+    db.create_user("carol", "secret", "user")
+    assert db.get_user_by_username("carol")["username"] == "carol"
+
+
+def test_update_password_of_missing_user(db):
+    assert db.update_user_password(9999, "x") == (False, "User not found")